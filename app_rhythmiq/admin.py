@@ -2,15 +2,37 @@ from django.contrib import admin
 
 # Register your models here.
 from app_rhythmiq.models.user_profile import UserProfile
-from app_rhythmiq.models.playlist import  Playlist
+from app_rhythmiq.models.playlist import Playlist
+from app_rhythmiq.models.playlist_entry import PlaylistEntry
 from app_rhythmiq.models.song import Song
+from app_rhythmiq.models.song_chart import SongChart
+from app_rhythmiq.models.song_chart_build import SongChartBuild
+from app_rhythmiq.models.song_neighbour import SongNeighbour
+from app_rhythmiq.models.song_rendition import SongRendition
 from app_rhythmiq.models.genre import Genre
+from app_rhythmiq.models.feed_item import FeedItem
+from app_rhythmiq.models.follow import Follow
+from app_rhythmiq.models.ingestion_job import IngestionJob
 from app_rhythmiq.models.downloaded_song import DownloadedSong
 from app_rhythmiq.models.like import Like
+from app_rhythmiq.models.media_blob import MediaBlob
+from app_rhythmiq.models.pending_file_deletion import PendingFileDeletion
+from app_rhythmiq.models.tombstone import Tombstone
 
 admin.site.register(UserProfile)
 admin.site.register(Playlist)
+admin.site.register(PlaylistEntry)
 admin.site.register(Song)
+admin.site.register(SongChart)
+admin.site.register(SongChartBuild)
+admin.site.register(SongNeighbour)
+admin.site.register(SongRendition)
 admin.site.register(Genre)
+admin.site.register(FeedItem)
+admin.site.register(Follow)
+admin.site.register(IngestionJob)
 admin.site.register(DownloadedSong)
 admin.site.register(Like)
+admin.site.register(MediaBlob)
+admin.site.register(PendingFileDeletion)
+admin.site.register(Tombstone)
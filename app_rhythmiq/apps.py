@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AppRhythmiqConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app_rhythmiq"
+
+    def ready(self):
+        # Connect the signals keeping the search index, response cache, image
+        # derivatives and sync tombstones in sync
+        from . import caching  # noqa: F401
+        from .services import images, search, sync  # noqa: F401
@@ -0,0 +1,93 @@
+"""
+Response caching for anonymous read endpoints.
+
+Cached responses are keyed on a version number per namespace. The signals below
+bump the version whenever a model the responses are built from changes, which
+invalidates every cached response of the namespace at once.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from .models import Genre, Song, SongRendition, UserProfile
+
+CACHE_TIMEOUT = 60
+KEY_PREFIX = "response_cache"
+
+
+def _version_key(namespace):
+    return f"{KEY_PREFIX}:{namespace}:version"
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Start from the clock so an evicted version is never reused
+        cache.add(_version_key(namespace), int(time.time() * 1000), None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def bump_version(*namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.add(_version_key(namespace), int(time.time() * 1000), None)
+
+
+def cache_anonymous_response(namespace, timeout=CACHE_TIMEOUT):
+    """
+    Cache the data of successful GET responses sent to anonymous users.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != "GET" or request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+
+            url = request.build_absolute_uri()
+            key = "{}:{}:{}:{}".format(
+                KEY_PREFIX,
+                namespace,
+                get_version(namespace),
+                hashlib.sha256(url.encode("utf-8")).hexdigest(),
+            )
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+@receiver(m2m_changed, sender=Song.artists.through)
+@receiver(m2m_changed, sender=Song.genres.through)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=SongRendition)
+@receiver(post_delete, sender=SongRendition)
+def invalidate_songs(sender, **kwargs):
+    bump_version("songs")
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_artists(sender, **kwargs):
+    # Song responses embed their artists
+    bump_version("songs", "artists")
@@ -0,0 +1,129 @@
+"""
+Conditional GET for the read endpoints.
+
+Views with ConditionalGetMixin send a weak ETag with their list and retrieve
+responses, and answer a request whose ``If-None-Match`` matches it with an
+empty 304 before anything is serialized. The ETag is a hash of:
+
+- the version of the rows: the id and ``updated_at`` of the rows of the page
+  for a list, read with the page query alone (no prefetches, two columns), and
+  the ``updated_at`` of the object for a detail;
+- the versions of the caching namespaces of the nested data the responses
+  embed (see caching), like the artists of songs;
+- the URL, the user and the negotiated format, which change the body too.
+
+``updated_at`` is set by saves (auto_now) and by the ``F()`` updates of the
+counters and edits that bypass them, so it changes with every field of a row.
+
+``Last-Modified`` is sent as well, but not used to answer 304: nested data can
+change without moving ``updated_at``, only the ETag covers it.
+"""
+
+import hashlib
+
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework.response import Response
+
+from .caching import get_version
+
+
+class NotModified(Exception):
+    """The client already has the current representation."""
+
+
+def etag_matches(request, etag):
+    """Weak comparison of the If-None-Match header with an ETag."""
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is None:
+        return False
+    etags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+    return "*" in etags or etag.removeprefix("W/") in etags
+
+
+class ConditionalGetMixin:
+    """
+    ETag, Last-Modified and 304 Not Modified for the read actions of a viewset.
+
+    ``version_field`` must change whenever a row changes, ``version_namespaces``
+    are the caching namespaces bumped when the data nested in a row changes.
+    """
+
+    conditional_actions = ("list", "retrieve")
+    version_field = "updated_at"
+    version_namespaces = ()
+
+    def get_versions_queryset(self):
+        return (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .select_related(None)
+        )
+
+    def get_row_versions(self):
+        """
+        The (pk, version) of the rows of the response, read without loading
+        or serializing them.
+        """
+        queryset = self.get_versions_queryset()
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            obj = get_object_or_404(
+                queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            self.check_object_permissions(self.request, obj)
+            return [(obj.pk, getattr(obj, self.version_field))]
+
+        rows = queryset.values_list("pk", self.version_field)
+        page = self.paginate_queryset(rows)
+        return list(rows) if page is None else page
+
+    def get_validators(self):
+        """The ETag and the last modification time of the response."""
+        rows = self.get_row_versions()
+        request = self.request
+        key = repr(
+            (
+                request.get_full_path(),
+                request.user.pk,
+                request.accepted_renderer.format,
+                [get_version(namespace) for namespace in self.version_namespaces],
+                rows,
+                # The previous and next links of a page depend on the other rows
+                getattr(self.paginator, "has_previous", None),
+                getattr(self.paginator, "has_next", None),
+            )
+        )
+        etag = f'W/"{hashlib.sha256(key.encode("utf-8")).hexdigest()}"'
+        last_modified = max((version for _, version in rows if version), default=None)
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if (
+            request.method in ("GET", "HEAD")
+            and self.action in self.conditional_actions
+        ):
+            self.validators = self.get_validators()
+            if etag_matches(request, self.validators[0]):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=304)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, "validators", None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+            # Revalidate every time, the body depends on the user and format
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ("Accept", "Authorization"))
+        return response
@@ -0,0 +1,148 @@
+"""
+Helpers shared by the benchmark commands and the tests to seed throwaway
+catalog data.
+"""
+
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app_rhythmiq.models import (
+    DownloadedSong,
+    Genre,
+    Like,
+    Playlist,
+    Song,
+    UserProfile,
+)
+from app_rhythmiq.services import playlists, search
+
+
+@contextmanager
+def rolled_back():
+    """Run the block inside a transaction that is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_catalog(songs, artists=5, genres=5, prefix="bench"):
+    """
+    Create a listener, artists, genres and songs with bulk inserts.
+
+    The listener likes and downloads every song and owns a playlist with all of them.
+    """
+    users = User.objects.bulk_create(
+        [User(username=f"{prefix}-listener", email=f"{prefix}-listener@rhythmiq.test")]
+        + [
+            User(
+                username=f"{prefix}-artist-{i}",
+                email=f"{prefix}-artist-{i}@rhythmiq.test",
+            )
+            for i in range(artists)
+        ]
+    )
+    profiles = UserProfile.objects.bulk_create(
+        [UserProfile(user=users[0], showed_name="Listener", account_type=1)]
+        + [
+            UserProfile(user=user, showed_name=f"Artist {i}", account_type=2)
+            for i, user in enumerate(users[1:])
+        ]
+    )
+    listener, artist_profiles = profiles[0], profiles[1:]
+
+    genre_objects = Genre.objects.bulk_create(
+        [Genre(name=f"{prefix} genre {i}") for i in range(genres)]
+    )
+    song_objects = Song.objects.bulk_create(
+        [
+            Song(
+                name=f"{prefix} song {i}",
+                description=f"Seeded {prefix} song number {i}",
+                song_path=f"songs/{prefix}-{i}.mp3",
+                duration=180,
+                streaming_numbers=i,
+            )
+            for i in range(songs)
+        ]
+    )
+
+    Song.artists.through.objects.bulk_create(
+        [
+            Song.artists.through(
+                song_id=song.id,
+                userprofile_id=artist_profiles[i % len(artist_profiles)].pk,
+            )
+            for i, song in enumerate(song_objects)
+        ]
+    )
+    Song.genres.through.objects.bulk_create(
+        [
+            Song.genres.through(
+                song_id=song.id, genre_id=genre_objects[i % len(genre_objects)].id
+            )
+            for i, song in enumerate(song_objects)
+        ]
+    )
+    Like.objects.bulk_create([Like(user=listener, song=song) for song in song_objects])
+    DownloadedSong.objects.bulk_create(
+        [DownloadedSong(user=listener, song=song) for song in song_objects]
+    )
+    playlist = Playlist.objects.create(name=f"{prefix} playlist", creator_user=listener)
+    playlists.set_songs(playlist, [song.id for song in song_objects])
+
+    return SimpleNamespace(
+        listener=listener,
+        artists=artist_profiles,
+        genres=genre_objects,
+        songs=song_objects,
+        playlist=playlist,
+    )
+
+
+def song_endpoints(catalog):
+    """The (name, url) of the song endpoints, for a seeded catalog."""
+    artist_id = catalog.artists[0].pk
+    genre = catalog.genres[0].name
+    return [
+        ("list", "/api/songs/"),
+        ("retrieve", f"/api/songs/{catalog.songs[0].id}/"),
+        ("filter_views", "/api/songs/filter_songs/?filter_by=views"),
+        ("filter_date_views", "/api/songs/filter_songs/?filter_by=date_views"),
+        ("filter_genre", f"/api/songs/filter_songs/?filter_by=genre&genres={genre}"),
+        ("search_songs", "/api/songs/search_songs/?search=bench"),
+        ("liked_songs", "/api/songs/liked_songs/"),
+        ("downloaded_songs", "/api/songs/downloaded_songs/"),
+        ("filter_by_artist", f"/api/songs/filter_by_artist/?artist_id={artist_id}"),
+        ("playlist_songs", f"/api/playlists/{catalog.playlist.id}/get_songs/"),
+    ]
+
+
+def measure_song_endpoints(sizes):
+    """
+    Seed a catalog of each size and GET every song endpoint as its listener.
+    Returns ``{name: {size: (queries, seconds)}}``; raises ValueError when an
+    endpoint doesn't answer 200.
+    """
+    results = {}
+    for size in sizes:
+        with rolled_back():
+            catalog = seed_catalog(size)
+            # The bulk inserts of the seeding don't index the songs
+            search.get_backend().rebuild()
+            client = APIClient(SERVER_NAME="localhost")
+            client.force_authenticate(catalog.listener.user)
+            for name, url in song_endpoints(catalog):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    raise ValueError(f"GET {url} returned {response.status_code}")
+                results.setdefault(name, {})[size] = (len(queries), elapsed)
+    return results
@@ -0,0 +1,98 @@
+import mimetypes
+import os
+import tempfile
+import time
+import wave
+
+import audioread
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from mutagen import File as MutagenFile
+
+from app_rhythmiq.services import audio_probe
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+
+
+def write_wav(path, size_mb):
+    """Write a silent 16-bit stereo WAV of about ``size_mb`` megabytes."""
+    frames = size_mb * 1024 * 1024 // (CHANNELS * SAMPLE_WIDTH)
+    second = b"\0" * SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(CHANNELS)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(SAMPLE_RATE)
+        for _ in range(frames // SAMPLE_RATE):
+            wav.writeframes(second)
+
+
+def legacy_probe(upload):
+    """
+    The upload path before the probe module: check the type, then copy the
+    upload to a temporary file and open it again with audioread.
+    """
+    mime_type, _ = mimetypes.guess_type(upload.name)
+    if mime_type == "audio/mpeg" and not MutagenFile(upload):
+        return None
+    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+        for chunk in upload.chunks():
+            temp_file.write(chunk)
+    try:
+        with audioread.audio_open(temp_file.name) as audio_file:
+            return audio_file.duration
+    finally:
+        # The original code leaked this file, the benchmark cleans it up
+        os.remove(temp_file.name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the header-only audio probe with the previous upload path "
+        "(temporary copy + audioread) on generated WAV files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="5,60",
+            help="Comma-separated file sizes in MB (default: 5,60).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs of each probe, the best time is reported (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+
+        with tempfile.TemporaryDirectory() as directory:
+            for size in sizes:
+                path = os.path.join(directory, f"bench_{size}mb.wav")
+                write_wav(path, size)
+
+                with open(path, "rb") as f:
+                    upload = File(f, name=os.path.basename(path))
+                    legacy = self.measure(legacy_probe, upload, options["repeat"])
+                    probe = self.measure(audio_probe.probe, upload, options["repeat"])
+
+                self.stdout.write(
+                    f"{size} MB: legacy {legacy * 1000:.2f} ms, "
+                    f"probe {probe * 1000:.2f} ms ({legacy / probe:.0f}x faster)"
+                )
+
+    def measure(self, function, upload, repeat):
+        best = None
+        for _ in range(repeat):
+            upload.seek(0)
+            start = time.perf_counter()
+            function(upload)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
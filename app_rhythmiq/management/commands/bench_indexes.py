@@ -0,0 +1,137 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from app_rhythmiq.models import Song
+from app_rhythmiq.pagination import KeysetPagination
+from app_rhythmiq.views import ArtistViewSet, SongViewSet
+
+from ._seeding import rolled_back, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large catalog and report the query plan and timing of the "
+        "page queries the views build (the seeded data is rolled back)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--songs",
+            type=int,
+            default=20000,
+            help="Number of songs to seed (default: 20000).",
+        )
+        parser.add_argument(
+            "--processing",
+            type=int,
+            default=100,
+            help=(
+                "Number of the most recent songs left processing, as uploads "
+                "being ingested (default: 100)."
+            ),
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs of each query, the best time is reported (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.stdout.write(f"Seeding {options['songs']} songs...")
+            catalog = seed_catalog(options["songs"], artists=50, genres=20)
+            processing = [song.id for song in catalog.songs[-options["processing"] :]]
+            Song.objects.filter(id__in=processing).update(status=Song.PROCESSING)
+
+            for name, queryset in self.get_queries(catalog):
+                elapsed = self.measure(queryset, options["repeat"])
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(queryset.explain())
+                self.stdout.write(
+                    f"best of {options['repeat']}: {elapsed * 1000:.2f} ms\n"
+                )
+
+    def get_view(self, viewset, action, user, **params):
+        request = Request(
+            APIRequestFactory(SERVER_NAME="localhost").get("/api/", params)
+        )
+        request.user = user
+        return viewset(
+            action=action, request=request, format_kwarg=None, args=(), kwargs={}
+        )
+
+    def get_page(self, view, queryset=None, after=None):
+        """The query KeysetPagination runs for a page, after the given row."""
+        if queryset is None:
+            queryset = view.get_queryset()
+        paginator = KeysetPagination()
+        ordering = paginator.get_ordering(view.request, queryset, view)
+        queryset = queryset.order_by(*ordering)
+        if after is not None:
+            position = [
+                getattr(after, field.lstrip("-").replace("pk", "id"))
+                for field in ordering
+            ]
+            queryset = queryset.filter(paginator.get_seek_filter(ordering, position))
+        return queryset[: paginator.get_page_size(view.request) + 1]
+
+    def get_queries(self, catalog):
+        user = catalog.listener.user
+        middle = catalog.songs[len(catalog.songs) // 2]
+        artist = catalog.artists[0]
+
+        recent = self.get_view(SongViewSet, "list", user)
+        popular = self.get_view(SongViewSet, "list", user, order_by="popular")
+        liked = self.get_view(SongViewSet, "liked_songs", user)
+        downloaded = self.get_view(SongViewSet, "downloaded_songs", user)
+        by_artist = self.get_view(SongViewSet, "filter_by_artist", user)
+        artists = self.get_view(ArtistViewSet, "list", user)
+
+        # The join annotations of the boundary row, as in a cursor
+        liked_middle = liked.get_queryset().get(id=middle.id)
+        downloaded_middle = downloaded.get_queryset().get(id=middle.id)
+
+        return [
+            ("songs, recent first", self.get_page(recent)),
+            ("songs, recent first, deep page", self.get_page(recent, after=middle)),
+            ("songs, most streamed first", self.get_page(popular)),
+            (
+                "songs, most streamed first, deep page",
+                self.get_page(popular, after=middle),
+            ),
+            ("liked songs of a user", self.get_page(liked)),
+            (
+                "liked songs of a user, deep page",
+                self.get_page(liked, after=liked_middle),
+            ),
+            ("downloaded songs of a user", self.get_page(downloaded)),
+            (
+                "downloaded songs of a user, deep page",
+                self.get_page(downloaded, after=downloaded_middle),
+            ),
+            (
+                "songs of an artist",
+                self.get_page(
+                    by_artist, by_artist.get_queryset().filter(artists=artist)
+                ),
+            ),
+            ("artists", self.get_page(artists)),
+            (
+                "artists by name prefix",
+                artists.get_queryset().filter(showed_name__startswith="Artist 1"),
+            ),
+        ]
+
+    def measure(self, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            # The page query alone, the plan shown
+            list(queryset.prefetch_related(None))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
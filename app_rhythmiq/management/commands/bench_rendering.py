@@ -0,0 +1,99 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from app_rhythmiq import renderers
+from app_rhythmiq.models import Song
+from app_rhythmiq.serializers import SongNormalizedSerializer, SongReadSerializer
+
+from ._seeding import rolled_back, seed_catalog
+
+SHAPES = [("default", SongReadSerializer), ("normalized", SongNormalizedSerializer)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a page of songs and compare the time to serialize and render it, "
+        "and the size of the response, for each shape and renderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--songs",
+            type=int,
+            default=1000,
+            help="Number of songs in the page (default: 1000).",
+        )
+        parser.add_argument(
+            "--artists",
+            type=int,
+            default=20,
+            help="Number of artists sharing the songs (default: 20).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs of each step, the best time is reported (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        with rolled_back():
+            seed_catalog(options["songs"], artists=options["artists"])
+            # Loaded once, the serializers only read the prefetched relations
+            songs = list(
+                SongReadSerializer.setup_eager_loading(Song.objects.order_by("-id"))
+            )
+            request = Request(
+                APIRequestFactory(SERVER_NAME="localhost").get("/api/songs/")
+            )
+            context = {"request": request}
+
+            payloads = {}
+            for shape, serializer_class in SHAPES:
+                elapsed, payload = self.measure(
+                    lambda: self.serialize(serializer_class, songs, context), repeat
+                )
+                payloads[shape] = payload
+                self.stdout.write(
+                    f"serialize {shape:<10} {len(songs)} songs: "
+                    f"{elapsed * 1000:8.1f} ms"
+                )
+
+        for name, renderer in self.get_renderers():
+            for shape, payload in payloads.items():
+                elapsed, body = self.measure(lambda: renderer.render(payload), repeat)
+                self.stdout.write(
+                    f"render {name:<8} {shape:<10} {elapsed * 1000:8.1f} ms "
+                    f"{len(body) / 1024:9.1f} KiB"
+                )
+
+    def serialize(self, serializer_class, songs, context):
+        serializer = serializer_class(songs, many=True, context=context)
+        results = serializer.data
+        # As KeysetPagination sends it, without the links
+        return {"results": results, **(getattr(serializer, "side_tables", None) or {})}
+
+    def get_renderers(self):
+        yield "drf", JSONRenderer()
+        if renderers.orjson is not None:
+            yield "orjson", renderers.ORJSONRenderer()
+        else:
+            self.stdout.write("orjson is not installed, skipped.")
+        if renderers.msgpack is not None:
+            yield "msgpack", renderers.MessagePackRenderer()
+        else:
+            self.stdout.write("msgpack is not installed, skipped.")
+
+    def measure(self, function, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
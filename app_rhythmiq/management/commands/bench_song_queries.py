@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ._seeding import measure_song_endpoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed catalogs of different sizes and check that every song endpoint "
+        "runs the same number of queries whatever the number of songs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="5,50",
+            help="Comma-separated numbers of songs to seed (default: 5,50).",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        try:
+            results = measure_song_endpoints(sizes)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        regressions = []
+        for name, measures in results.items():
+            counts = [measures[size][0] for size in sizes]
+            line = "  ".join(
+                f"{size:>6} songs: {count:>3} queries {elapsed * 1000:7.1f} ms"
+                for size, (count, elapsed) in measures.items()
+            )
+            self.stdout.write(f"{name:<20} {line}")
+            if len(set(counts)) > 1:
+                regressions.append(name)
+
+        if regressions:
+            raise CommandError(
+                "Query count grows with the number of songs for: "
+                + ", ".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("Query counts are constant."))
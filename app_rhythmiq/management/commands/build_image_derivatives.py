@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.caching import bump_version
+from app_rhythmiq.services import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the missing WebP derivatives of the song and playlist covers and "
+        "profile pictures."
+    )
+
+    def handle(self, *args, **options):
+        for model in images.IMAGE_FIELDS:
+            refreshed = 0
+            for instance in model.objects.iterator():
+                if images.refresh_derivatives(instance):
+                    refreshed += 1
+            self.stdout.write(
+                f"{model.__name__}: refreshed the derivatives of {refreshed} images."
+            )
+        bump_version("songs", "artists")
@@ -0,0 +1,56 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from app_rhythmiq.services import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the similar songs of every song from the likes and downloads "
+        "(requires numpy and scipy)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            default=recommendations.NEIGHBOURS,
+            help=f"Similar songs kept per song (default: {recommendations.NEIGHBOURS}).",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=recommendations.BATCH_SIZE,
+            help="Songs compared to the catalog at a time "
+            f"(default: {recommendations.BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep rebuilding every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=24 * 3600,
+            help="Seconds between two rebuilds with --loop (default: 86400).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            try:
+                songs, stored = recommendations.build(
+                    k=options["neighbours"], batch_size=options["batch"]
+                )
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                f"Stored {stored} neighbours for {songs} songs in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
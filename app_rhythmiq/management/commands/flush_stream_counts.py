@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import charts, stream_counter
+
+
+class Command(BaseCommand):
+    help = "Apply the song plays buffered in the cache to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep flushing every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=30,
+            help="Seconds between two flushes with --loop (default: 30).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deltas = stream_counter.flush()
+            if deltas:
+                # Re-rank the charts the played songs can appear in
+                charts.refresh_charts(song_ids=deltas)
+            self.stdout.write(
+                f"Flushed {sum(deltas.values())} plays for {len(deltas)} songs."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,50 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import ingestion
+
+
+class Command(BaseCommand):
+    help = "Run the ingestion pipeline on the songs waiting in the upload queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Worker processes running the pipeline (default: 2).",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=20,
+            help="Jobs claimed at a time (default: 20).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the queue every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=5,
+            help="Seconds between two polls of an empty queue with --loop (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            statuses = ingestion.run_pending(
+                limit=options["batch"], workers=options["workers"]
+            )
+            counts = Counter(statuses)
+            self.stdout.write(
+                f"Processed {len(statuses)} uploads: {counts['done']} ready, "
+                f"{counts['failed']} failed."
+            )
+            if not options["loop"]:
+                return
+            if not statuses:
+                time.sleep(options["interval"])
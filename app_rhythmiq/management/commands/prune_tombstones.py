@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones of the delta sync older than the retention; "
+        "clients with an older token get a full snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep pruning every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=86400,
+            help="Seconds between two runs with --loop (default: 86400).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            pruned = sync.prune()
+            self.stdout.write(
+                f"Pruned {pruned} tombstones in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import file_gc
+
+
+class Command(BaseCommand):
+    help = "Delete the media files queued for deletion that are still unused."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scan",
+            action="store_true",
+            help="First repair the reference counts of the stored files and queue "
+            "the files of MEDIA_ROOT that no row references.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="With --scan, only list the wrong reference counts and the "
+            "unreferenced files.",
+        )
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=3600,
+            help="With --scan, skip files modified in the last GRACE seconds "
+            "(default: 3600).",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=500,
+            help="Queued deletions processed at a time (default: 500).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep reaping every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Seconds between two passes with --loop (default: 60).",
+        )
+
+    def handle(self, *args, **options):
+        if options["scan"]:
+            if options["dry_run"]:
+                for name, ref_count, actual in file_gc.find_ref_count_drift():
+                    self.stdout.write(
+                        f"{name}: {ref_count} references counted, {actual} rows"
+                    )
+                for name in file_gc.find_orphans(options["grace"]):
+                    self.stdout.write(name)
+                return
+            repaired = file_gc.repair_ref_counts(options["batch"])
+            self.stdout.write(f"Repaired {repaired} reference counts.")
+            queued = file_gc.queue_orphans(options["grace"])
+            self.stdout.write(f"Queued {queued} unreferenced files.")
+
+        while True:
+            deleted = processed = 0
+            while True:
+                batch_deleted, batch_processed = file_gc.reap(options["batch"])
+                deleted += batch_deleted
+                processed += batch_processed
+                if batch_processed < options["batch"]:
+                    break
+            self.stdout.write(
+                f"Deleted {deleted} files for {processed} queued deletions."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import charts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed song charts read by filter_songs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep rebuilding every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=300,
+            help="Seconds between two rebuilds with --loop (default: 300).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            charts.refresh_charts()
+            self.stdout.write(
+                f"Charts rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import feeds
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the home feeds from the follows, likes and downloads, and cap them "
+        "to the newest songs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="users",
+            help="Only rebuild the feed of this user id (repeatable).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep rebuilding every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=3600,
+            help="Seconds between two rebuilds with --loop (default: 3600).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            rebuilt = feeds.rebuild_feeds(options["users"])
+            self.stdout.write(
+                f"Rebuilt {rebuilt} feeds in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
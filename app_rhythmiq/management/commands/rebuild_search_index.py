@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_rhythmiq.services import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the song and artist full-text search index."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
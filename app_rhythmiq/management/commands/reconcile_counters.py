@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_rhythmiq.services import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the like, follower and track counters and repair the ones that "
+        "drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the wrong counters.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep reconciling every --interval seconds (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=3600,
+            help="Seconds between two runs with --loop (default: 3600).",
+        )
+
+    def handle(self, *args, **options):
+        verb = "Found" if options["dry_run"] else "Repaired"
+        while True:
+            start = time.perf_counter()
+            repaired = counters.reconcile(dry_run=options["dry_run"])
+            for counter, count in repaired.items():
+                self.stdout.write(f"{verb} {count} wrong {counter}.")
+            self.stdout.write(
+                f"Counters reconciled in {(time.perf_counter() - start) * 1000:.0f} ms."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
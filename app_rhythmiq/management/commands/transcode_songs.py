@@ -0,0 +1,61 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from app_rhythmiq.services import transcoding
+
+
+class Command(BaseCommand):
+    help = "Transcode the ready songs to the renditions of the quality ladder."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Worker processes running the transcoder (default: 2).",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=20,
+            help="Songs transcoded at a time (default: 20).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep transcoding new songs, polling every --interval seconds once "
+            "the catalog is done (background worker).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=30,
+            help="Seconds between two passes over the catalog with --loop (default: 30).",
+        )
+
+    def handle(self, *args, **options):
+        after_id = 0
+        while True:
+            try:
+                created, last_id = transcoding.transcode_pending(
+                    limit=options["batch"],
+                    workers=options["workers"],
+                    after_id=after_id,
+                )
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+
+            if last_id is not None:
+                self.stdout.write(
+                    f"Created {created} renditions, up to song {last_id}."
+                )
+                after_id = last_id
+                continue
+
+            # Walked the whole catalog, start over for the new songs
+            if not options["loop"]:
+                return
+            after_id = 0
+            time.sleep(options["interval"])
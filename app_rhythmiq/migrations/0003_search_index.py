@@ -0,0 +1,52 @@
+from django.db import migrations
+
+SONG_TABLE = "song_search"
+ARTIST_TABLE = "artist_search"
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SONG_TABLE} USING fts5("
+        "name, description, genres, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {ARTIST_TABLE} USING fts5("
+        "showed_name, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {SONG_TABLE} (rowid, name, description, genres) "
+        "SELECT song.id, song.name, song.description, COALESCE(("
+        "  SELECT group_concat(genre.name, ' ') "
+        "  FROM app_rhythmiq_song_genres song_genre "
+        "  JOIN app_rhythmiq_genre genre ON genre.id = song_genre.genre_id "
+        "  WHERE song_genre.song_id = song.id"
+        "), '') FROM app_rhythmiq_song song"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {ARTIST_TABLE} (rowid, showed_name) "
+        "SELECT user_id, showed_name FROM app_rhythmiq_userprofile "
+        "WHERE account_type = 2"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SONG_TABLE}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {ARTIST_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0002_alter_song_name_alter_userprofile_showed_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
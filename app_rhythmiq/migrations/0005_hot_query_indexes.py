@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0004_song_chart"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="downloadedsong",
+            index=models.Index(
+                fields=["user", "-last_downloaded_at"], name="download_user_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["user", "-created_at"], name="like_user_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(fields=["-created_at", "-id"], name="song_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["-streaming_numbers", "-id"], name="song_popular_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                fields=["account_type", "showed_name"], name="profile_type_name_idx"
+            ),
+        ),
+    ]
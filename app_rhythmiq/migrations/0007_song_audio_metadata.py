@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0006_ingestion_pipeline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="bitrate",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="channels",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="sample_rate",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
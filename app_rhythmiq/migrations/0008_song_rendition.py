@@ -0,0 +1,62 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:27
+
+import app_rhythmiq.models.song_rendition
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0007_song_audio_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SongRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "codec",
+                    models.CharField(
+                        choices=[("mp3", "MP3"), ("opus", "Opus"), ("wav", "WAV")],
+                        max_length=10,
+                    ),
+                ),
+                ("bitrate", models.IntegerField()),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to=app_rhythmiq.models.song_rendition.rendition_file_path
+                    ),
+                ),
+                ("size", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "song",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="app_rhythmiq.song",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["song", "bitrate"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("song", "codec", "bitrate"),
+                        name="unique_song_rendition",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0008_song_rendition"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playlist",
+            name="cover_derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="cover_derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="profile_picture_derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
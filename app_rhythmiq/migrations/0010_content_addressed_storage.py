@@ -0,0 +1,74 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:32
+
+import app_rhythmiq.models.playlist
+import app_rhythmiq.models.song
+import app_rhythmiq.models.user_profile
+import app_rhythmiq.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0009_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.BigIntegerField()),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="playlist",
+            name="cover_image_path",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=app_rhythmiq.storage.get_media_storage,
+                upload_to=app_rhythmiq.models.playlist.playlist_cover_image_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="song",
+            name="cover_image_path",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=app_rhythmiq.storage.get_media_storage,
+                upload_to=app_rhythmiq.models.song.cover_image_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="song",
+            name="song_path",
+            field=models.FileField(
+                storage=app_rhythmiq.storage.get_media_storage,
+                upload_to=app_rhythmiq.models.song.song_file_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="profile_picture_path",
+            field=models.ImageField(
+                blank=True,
+                default="profiles/default_profile_picture.png",
+                null=True,
+                storage=app_rhythmiq.storage.get_media_storage,
+                upload_to=app_rhythmiq.models.user_profile.profile_picture_path,
+            ),
+        ),
+    ]
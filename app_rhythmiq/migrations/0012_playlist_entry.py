@@ -0,0 +1,117 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+POSITION_GAP = 65536
+
+
+def copy_playlist_songs(apps, schema_editor):
+    """Number the songs of each playlist in the order they were added."""
+    Playlist = apps.get_model("app_rhythmiq", "Playlist")
+    PlaylistEntry = apps.get_model("app_rhythmiq", "PlaylistEntry")
+
+    positions = {}
+    entries = []
+    for playlist_id, song_id in (
+        Playlist.songs.through.objects.order_by("playlist_id", "id")
+        .values_list("playlist_id", "song_id")
+        .iterator()
+    ):
+        positions[playlist_id] = positions.get(playlist_id, 0) + POSITION_GAP
+        entries.append(
+            PlaylistEntry(
+                playlist_id=playlist_id,
+                song_id=song_id,
+                position=positions[playlist_id],
+            )
+        )
+    PlaylistEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def copy_playlist_entries(apps, schema_editor):
+    Playlist = apps.get_model("app_rhythmiq", "Playlist")
+    PlaylistEntry = apps.get_model("app_rhythmiq", "PlaylistEntry")
+    Playlist.songs.through.objects.bulk_create(
+        [
+            Playlist.songs.through(playlist_id=playlist_id, song_id=song_id)
+            for playlist_id, song_id in PlaylistEntry.objects.order_by(
+                "playlist_id", "position", "id"
+            ).values_list("playlist_id", "song_id")
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    Give Playlist.songs a through model with positions. Django can't add a
+    through model to an existing field, so the rows are copied to the new
+    table and the field is re-created on it.
+    """
+
+    dependencies = [
+        ("app_rhythmiq", "0011_pending_file_deletion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlaylistEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.BigIntegerField()),
+                ("added_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "playlist",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries",
+                        to="app_rhythmiq.playlist",
+                    ),
+                ),
+                (
+                    "song",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="playlist_entries",
+                        to="app_rhythmiq.song",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["playlist", "position", "id"],
+                        name="playlist_position_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("playlist", "song"), name="unique_playlist_song"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(copy_playlist_songs, copy_playlist_entries),
+        migrations.RemoveField(
+            model_name="playlist",
+            name="songs",
+        ),
+        migrations.AddField(
+            model_name="playlist",
+            name="songs",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="playlists",
+                through="app_rhythmiq.PlaylistEntry",
+                to="app_rhythmiq.song",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_rows(apps, schema_editor):
+    Like = apps.get_model("app_rhythmiq", "Like")
+    Playlist = apps.get_model("app_rhythmiq", "Playlist")
+    PlaylistEntry = apps.get_model("app_rhythmiq", "PlaylistEntry")
+    Song = apps.get_model("app_rhythmiq", "Song")
+    UserProfile = apps.get_model("app_rhythmiq", "UserProfile")
+
+    def count_of(counted_model, key):
+        return Coalesce(
+            Subquery(
+                counted_model.objects.filter(**{key: OuterRef("pk")})
+                .order_by()
+                .values(key)
+                .annotate(count=Count("*"))
+                .values("count")
+            ),
+            0,
+        )
+
+    Song.objects.update(like_count=count_of(Like, "song"))
+    UserProfile.objects.update(
+        follower_count=count_of(UserProfile.following_artists.through, "to_userprofile")
+    )
+    Playlist.objects.update(
+        track_count=count_of(PlaylistEntry, "playlist"),
+        follower_count=count_of(Playlist.followers.through, "playlist"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0012_playlist_entry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playlist",
+            name="follower_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="playlist",
+            name="track_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="song",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="follower_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,153 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0015_song_neighbour"),
+    ]
+
+    operations = [
+        # Adopt the automatic through table of following_artists as the Follow
+        # model, keeping its table and its rows
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="Follow",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "from_userprofile",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="follows",
+                                to="app_rhythmiq.userprofile",
+                            ),
+                        ),
+                        (
+                            "to_userprofile",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="followed_by",
+                                to="app_rhythmiq.userprofile",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "app_rhythmiq_userprofile_following_artists",
+                        "unique_together": {("from_userprofile", "to_userprofile")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="userprofile",
+                    name="following_artists",
+                    field=models.ManyToManyField(
+                        blank=True,
+                        related_name="followers",
+                        through="app_rhythmiq.Follow",
+                        to="app_rhythmiq.userprofile",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="follow",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["from_userprofile", "created_at"],
+                name="follow_user_created_idx",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("like", "Liked song"),
+                            ("download", "Downloaded song"),
+                            ("playlist", "Playlist"),
+                            ("playlist_song", "Song of a playlist"),
+                            ("follow", "Followed artist"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("parent_id", models.BigIntegerField(blank=True, null=True)),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="playlist",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="playlistentry",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="playlist",
+            index=models.Index(
+                fields=["creator_user", "updated_at"], name="playlist_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playlistentry",
+            index=models.Index(
+                fields=["playlist", "updated_at"], name="playlist_entry_updated_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tombstones",
+                to="app_rhythmiq.userprofile",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"
+            ),
+        ),
+    ]
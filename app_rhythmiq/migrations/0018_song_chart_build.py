@@ -0,0 +1,74 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0017_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SongChartBuild",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("global", "Most streamed"),
+                            ("new", "New releases"),
+                            ("genre", "Most streamed in a genre"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "window",
+                    models.CharField(
+                        choices=[
+                            ("all", "All time"),
+                            ("month", "Released in the last 30 days"),
+                            ("week", "Released in the last 7 days"),
+                        ],
+                        default="all",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "refreshed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "genre",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="app_rhythmiq.genre",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "window", "genre"],
+                        name="songchartbuild_chart_idx",
+                    )
+                ],
+            },
+        ),
+    ]
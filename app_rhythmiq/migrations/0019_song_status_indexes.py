@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_rhythmiq", "0018_song_chart_build"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="song",
+            name="song_recent_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="song",
+            name="song_popular_idx",
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"], name="song_status_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["status", "-streaming_numbers", "-id"],
+                name="song_status_popular_idx",
+            ),
+        ),
+    ]
@@ -1,8 +1,37 @@
 from .downloaded_song import DownloadedSong
+from .feed_item import FeedItem
+from .follow import Follow
 from .genre import Genre
+from .ingestion_job import IngestionJob
 from .like import Like
+from .media_blob import MediaBlob
+from .pending_file_deletion import PendingFileDeletion
 from .playlist import Playlist
+from .playlist_entry import PlaylistEntry
 from .song import Song
+from .song_chart import SongChart
+from .song_chart_build import SongChartBuild
+from .song_neighbour import SongNeighbour
+from .song_rendition import SongRendition
+from .tombstone import Tombstone
 from .user_profile import UserProfile
 
-__all__ = ["DownloadedSong", "Genre", "Like", "Playlist", "Song", "UserProfile"]
+__all__ = [
+    "DownloadedSong",
+    "FeedItem",
+    "Follow",
+    "Genre",
+    "IngestionJob",
+    "Like",
+    "MediaBlob",
+    "PendingFileDeletion",
+    "Playlist",
+    "PlaylistEntry",
+    "Song",
+    "SongChart",
+    "SongChartBuild",
+    "SongNeighbour",
+    "SongRendition",
+    "Tombstone",
+    "UserProfile",
+]
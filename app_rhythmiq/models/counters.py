@@ -0,0 +1,23 @@
+class CounterFieldsMixin:
+    """
+    Leave the denormalized counters out of the saves of existing rows.
+
+    The counters are only written with ``F()`` updates (see services.counters), a
+    full save of an instance loaded before a like or a follow would otherwise
+    write its stale count back.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
@@ -10,6 +10,12 @@ class DownloadedSong(models.Model):
 
     class Meta:
         unique_together = ("user", "song")
+        indexes = [
+            # A user's downloads, most recent first
+            models.Index(
+                fields=["user", "-last_downloaded_at"], name="download_user_recent_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.user.username} downloaded {self.song.name}"
@@ -0,0 +1,38 @@
+from django.db import models
+from .song import Song
+from .user_profile import UserProfile
+
+
+class FeedItem(models.Model):
+    """
+    A song of the home feed of a user. Feeds are written when songs are released
+    or artists followed, and rebuilt periodically; see services.feeds.
+    """
+
+    FOLLOWED_ARTIST = "artist"
+    GENRE = "genre"
+    REASONS = [
+        (FOLLOWED_ARTIST, "New release of a followed artist"),
+        (GENRE, "New release in a genre the user listens to"),
+    ]
+
+    user = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="feed_items"
+    )
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name="feed_items")
+    reason = models.CharField(max_length=10, choices=REASONS)
+    # Copied from the song, the feed is read in this order from the index
+    published_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "song"], name="unique_feed_song")
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-published_at", "-song"], name="feed_user_recent_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.song.name} in the feed of {self.user.user.username}"
@@ -0,0 +1,32 @@
+from django.db import models
+from .user_profile import UserProfile
+
+
+class Follow(models.Model):
+    """
+    A user following an artist, the through model of
+    ``UserProfile.following_artists``. It keeps the table and the column names
+    of the automatic through table it replaced.
+    """
+
+    from_userprofile = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="follows"
+    )
+    to_userprofile = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="followed_by"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "app_rhythmiq_userprofile_following_artists"
+        unique_together = [("from_userprofile", "to_userprofile")]
+        indexes = [
+            # The follows of a user changed since a sync
+            models.Index(
+                fields=["from_userprofile", "created_at"],
+                name="follow_user_created_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.from_userprofile} follows {self.to_userprofile}"
@@ -0,0 +1,37 @@
+from django.db import models
+from .song import Song
+
+
+class IngestionJob(models.Model):
+    """A queued run of the ingestion pipeline for an uploaded song."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    song = models.ForeignKey(
+        Song, on_delete=models.CASCADE, related_name="ingestion_jobs"
+    )
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            # Workers claim the oldest queued jobs first
+            models.Index(fields=["status", "id"], name="ingestionjob_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.song.name}: {self.status}"
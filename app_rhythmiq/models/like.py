@@ -10,6 +10,10 @@ class Like(models.Model):
 
     class Meta:
         unique_together = (("user", "song"),)
+        indexes = [
+            # A user's likes, most recent first. (user, song) is the unique index.
+            models.Index(fields=["user", "-created_at"], name="like_user_recent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.user.username} liked {self.song.name}"
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """
+    A file of the content-addressed storage and the number of uploads stored
+    as it. See app_rhythmiq.storage.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class PendingFileDeletion(models.Model):
+    """
+    A media file to delete once nothing references it, queued in the
+    transaction deleting its last reference. See services.file_gc.
+    """
+
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return self.name
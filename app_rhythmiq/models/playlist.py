@@ -1,42 +1,81 @@
-import os
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from .counters import CounterFieldsMixin
 from .user_profile import UserProfile
 from .song import Song
-import uuid
+from ..storage import (
+    find_replaced_files,
+    get_media_storage,
+    release_file,
+    release_replaced_files,
+)
 
 
+# The storage names the files after the hash of their content
 def playlist_cover_image_path(instance, filename):
-    ext = filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
     return f"playlists/{filename}"
 
 
-class Playlist(models.Model):
+class Playlist(CounterFieldsMixin, models.Model):
+    counter_fields = ("track_count", "follower_count")
+
     name = models.CharField(max_length=255)
     cover_image_path = models.ImageField(
-        upload_to=playlist_cover_image_path, blank=True, null=True
+        upload_to=playlist_cover_image_path,
+        storage=get_media_storage,
+        blank=True,
+        null=True,
     )
+    # WebP sizes of the cover, built by services.images
+    cover_derivatives = models.JSONField(default=dict, blank=True)
     creator_user = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set by the edits of services.playlists and the counters
+    updated_at = models.DateTimeField(auto_now=True)
     private = models.BooleanField(default=False)
-    songs = models.ManyToManyField(Song, related_name="playlists", blank=True)
+    songs = models.ManyToManyField(
+        Song, through="PlaylistEntry", related_name="playlists", blank=True
+    )
     followers = models.ManyToManyField(
         UserProfile, related_name="playlists_followed", blank=True
     )
+    # Maintained by services.counters, repaired by manage.py reconcile_counters
+    track_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The playlists of a user changed since a sync
+            models.Index(
+                fields=["creator_user", "updated_at"], name="playlist_user_updated_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     def delete_files(self):
         """Supprime le fichier image de couverture associé."""
-        if self.cover_image_path:
-            if os.path.isfile(self.cover_image_path.path):
-                os.remove(self.cover_image_path.path)
+        release_file(self.cover_image_path)
 
 
 @receiver(post_delete, sender=Playlist)
 def delete_playlist_files(sender, instance, **kwargs):
     """Signal pour supprimer les fichiers de couverture lorsque la Playlist est supprimée."""
     instance.delete_files()
+
+
+@receiver(pre_save, sender=Playlist)
+def find_replaced_playlist_files(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    if not raw:
+        instance._replaced_files = find_replaced_files(
+            instance, ("cover_image_path",), update_fields
+        )
+
+
+@receiver(post_save, sender=Playlist)
+def release_replaced_playlist_files(sender, instance, **kwargs):
+    release_replaced_files(instance)
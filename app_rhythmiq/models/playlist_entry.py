@@ -0,0 +1,43 @@
+from django.db import models
+from .playlist import Playlist
+from .song import Song
+
+
+class PlaylistEntry(models.Model):
+    """
+    A song of a playlist at its position. Positions are spaced by
+    ``POSITION_GAP`` so a song can be inserted or moved between two others by
+    writing only its own row; see services.playlists.
+    """
+
+    POSITION_GAP = 65536
+
+    playlist = models.ForeignKey(
+        Playlist, on_delete=models.CASCADE, related_name="entries"
+    )
+    song = models.ForeignKey(
+        Song, on_delete=models.CASCADE, related_name="playlist_entries"
+    )
+    position = models.BigIntegerField()
+    added_at = models.DateTimeField(auto_now_add=True)
+    # Also set by the bulk updates of services.playlists, for the delta sync
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["position", "id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["playlist", "song"], name="unique_playlist_song"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["playlist", "position", "id"], name="playlist_position_idx"
+            ),
+            models.Index(
+                fields=["playlist", "updated_at"], name="playlist_entry_updated_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.playlist.name} #{self.position}: {self.song.name}"
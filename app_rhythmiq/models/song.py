@@ -1,50 +1,100 @@
 from django.db import models
+from .counters import CounterFieldsMixin
 from .user_profile import UserProfile
+from ..storage import (
+    find_replaced_files,
+    get_media_storage,
+    release_file,
+    release_replaced_files,
+)
 
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
-import os
-import uuid
 
 
+# The storage names the files after the hash of their content
 def song_file_path(instance, filename):
-    ext = filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
     return f"songs/{filename}"
 
 
 def cover_image_path(instance, filename):
-    ext = filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
     return f"songs/covers/{filename}"
 
 
-class Song(models.Model):
+class Song(CounterFieldsMixin, models.Model):
+    # Uploads stay processing until the ingestion pipeline has checked them
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+    STATUSES = [
+        (PROCESSING, "Processing"),
+        (READY, "Ready"),
+        (FAILED, "Failed"),
+    ]
+    counter_fields = ("like_count",)
+
     name = models.CharField(max_length=100)
     cover_image_path = models.ImageField(
-        upload_to=cover_image_path, blank=True, null=True
+        upload_to=cover_image_path,
+        storage=get_media_storage,
+        blank=True,
+        null=True,
     )
+    # WebP sizes of the cover, built by services.images
+    cover_derivatives = models.JSONField(default=dict, blank=True)
     description = models.TextField(blank=True)
-    song_path = models.FileField(upload_to=song_file_path)
+    song_path = models.FileField(upload_to=song_file_path, storage=get_media_storage)
     created_at = models.DateTimeField(auto_now_add=True)
-    duration = models.IntegerField()
+    # Also set by the F() updates of the counters, see conditional
+    updated_at = models.DateTimeField(auto_now=True)
+    duration = models.IntegerField(null=True, blank=True)
+    # Read from the audio headers, in bits per second and Hz
+    bitrate = models.IntegerField(null=True, blank=True)
+    sample_rate = models.IntegerField(null=True, blank=True)
+    channels = models.PositiveSmallIntegerField(null=True, blank=True)
     streaming_numbers = models.IntegerField(default=0)
+    # Maintained by services.counters, repaired by manage.py reconcile_counters
+    like_count = models.PositiveIntegerField(default=0)
     artists = models.ManyToManyField(UserProfile, related_name="songs")
     genres = models.ManyToManyField("Genre", related_name="songs", blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=READY)
+
+    class Meta:
+        indexes = [
+            # Keyset pages and charts of the ready songs, most recent or most
+            # streamed first
+            models.Index(
+                fields=["status", "-created_at", "-id"], name="song_status_recent_idx"
+            ),
+            models.Index(
+                fields=["status", "-streaming_numbers", "-id"],
+                name="song_status_popular_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     def delete_files(self):
-        if self.cover_image_path:
-            if os.path.isfile(self.cover_image_path.path):
-                os.remove(self.cover_image_path.path)
-        if self.song_path:
-            if os.path.isfile(self.song_path.path):
-                os.remove(self.song_path.path)
+        # Queued for manage.py reap_files, once no other row uses them
+        release_file(self.cover_image_path)
+        release_file(self.song_path)
 
 
 @receiver(post_delete, sender=Song)
 def delete_song_files(sender, instance, **kwargs):
     instance.delete_files()
+
+
+@receiver(pre_save, sender=Song)
+def find_replaced_song_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        instance._replaced_files = find_replaced_files(
+            instance, ("cover_image_path", "song_path"), update_fields
+        )
+
+
+@receiver(post_save, sender=Song)
+def release_replaced_song_files(sender, instance, **kwargs):
+    release_replaced_files(instance)
@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils import timezone
+from .genre import Genre
+from .song import Song
+
+
+class SongChart(models.Model):
+    """One ranked entry of a precomputed chart, rebuilt by services.charts."""
+
+    KINDS = [
+        ("global", "Most streamed"),
+        ("new", "New releases"),
+        ("genre", "Most streamed in a genre"),
+    ]
+    WINDOWS = [
+        ("all", "All time"),
+        ("month", "Released in the last 30 days"),
+        ("week", "Released in the last 7 days"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    window = models.CharField(max_length=10, choices=WINDOWS, default="all")
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, null=True, blank=True, related_name="charts"
+    )
+    position = models.PositiveIntegerField()
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name="charts")
+    streaming_numbers = models.IntegerField()
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["kind", "window", "genre", "position"]
+        indexes = [
+            models.Index(
+                fields=["kind", "window", "genre", "position"],
+                name="songchart_ranking_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind}/{self.window} #{self.position}: {self.song.name}"
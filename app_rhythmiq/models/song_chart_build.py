@@ -0,0 +1,28 @@
+from django.db import models
+from django.utils import timezone
+from .genre import Genre
+from .song_chart import SongChart
+
+
+class SongChartBuild(models.Model):
+    """
+    Marks a chart as built, so an empty chart is told apart from one never
+    built. Rewritten with the rows of the chart by services.charts.
+    """
+
+    kind = models.CharField(max_length=10, choices=SongChart.KINDS)
+    window = models.CharField(max_length=10, choices=SongChart.WINDOWS, default="all")
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["kind", "window", "genre"], name="songchartbuild_chart_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind}/{self.window} built at {self.refreshed_at}"
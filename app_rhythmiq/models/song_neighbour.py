@@ -0,0 +1,27 @@
+from django.db import models
+from .song import Song
+
+
+class SongNeighbour(models.Model):
+    """
+    One of the songs most liked and downloaded by the listeners of a song, by
+    rank. Rebuilt offline by manage.py build_recommendations.
+    """
+
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name="neighbours")
+    neighbour = models.ForeignKey(
+        Song, on_delete=models.CASCADE, related_name="neighbour_of"
+    )
+    rank = models.PositiveSmallIntegerField()
+    # Cosine similarity of the listeners of both songs, in (0, 1]
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["song", "rank"], name="unique_song_neighbour_rank"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.song.name} #{self.rank}: {self.neighbour.name}"
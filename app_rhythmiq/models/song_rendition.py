@@ -0,0 +1,49 @@
+from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .song import Song
+from ..storage import release_file
+import uuid
+
+
+def rendition_file_path(instance, filename):
+    ext = filename.split(".")[-1]
+    filename = f"{uuid.uuid4()}.{ext}"
+    return f"songs/renditions/{filename}"
+
+
+class SongRendition(models.Model):
+    """A transcoded copy of a song's audio, produced by services.transcoding."""
+
+    CODECS = [
+        ("mp3", "MP3"),
+        ("opus", "Opus"),
+        ("wav", "WAV"),
+    ]
+
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name="renditions")
+    codec = models.CharField(max_length=10, choices=CODECS)
+    # In bits per second, like Song.bitrate
+    bitrate = models.IntegerField()
+    file = models.FileField(upload_to=rendition_file_path)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["song", "bitrate"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["song", "codec", "bitrate"], name="unique_song_rendition"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.song.name} ({self.codec} {self.bitrate // 1000} kbps)"
+
+    def delete_files(self):
+        release_file(self.file)
+
+
+@receiver(post_delete, sender=SongRendition)
+def delete_rendition_files(sender, instance, **kwargs):
+    instance.delete_files()
@@ -0,0 +1,42 @@
+from django.db import models
+from .user_profile import UserProfile
+
+
+class Tombstone(models.Model):
+    """
+    A row deleted from the data of a user, kept so the delta sync can tell
+    clients about it; see services.sync. Pruned after
+    ``services.sync.TOMBSTONE_RETENTION``.
+    """
+
+    LIKE = "like"
+    DOWNLOAD = "download"
+    PLAYLIST = "playlist"
+    PLAYLIST_SONG = "playlist_song"
+    FOLLOW = "follow"
+    KINDS = [
+        (LIKE, "Liked song"),
+        (DOWNLOAD, "Downloaded song"),
+        (PLAYLIST, "Playlist"),
+        (PLAYLIST_SONG, "Song of a playlist"),
+        (FOLLOW, "Followed artist"),
+    ]
+
+    user = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="tombstones"
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    # The song, playlist or artist id; the playlist of a playlist song
+    object_id = models.BigIntegerField()
+    parent_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted by {self.user}"
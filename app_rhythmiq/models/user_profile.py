@@ -1,9 +1,14 @@
-import os
-import uuid
 import logging
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_delete
+from .counters import CounterFieldsMixin
+from ..storage import (
+    find_replaced_files,
+    get_media_storage,
+    release_file,
+    release_replaced_files,
+)
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 
@@ -12,18 +17,18 @@ logger = logging.getLogger(__name__)
 DEFAULT_PROFILE_PICTURE = "profiles/default_profile_picture.png"
 
 
+# The storage names the files after the hash of their content
 def profile_picture_path(instance, filename):
-    ext = filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
     return f"profiles/{filename}"
 
 
-class UserProfile(models.Model):
+class UserProfile(CounterFieldsMixin, models.Model):
     ACCOUNT_TYPES = [
         (0, "Admin"),
         (1, "User"),
         (2, "Artist"),
     ]
+    counter_fields = ("follower_count",)
 
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True
@@ -31,16 +36,35 @@ class UserProfile(models.Model):
     showed_name = models.CharField(max_length=30, blank=True)
     profile_picture_path = models.ImageField(
         upload_to=profile_picture_path,
+        storage=get_media_storage,
         blank=True,
         null=True,
         default=DEFAULT_PROFILE_PICTURE,
     )
+    # WebP sizes of the picture, built by services.images
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True)
     private = models.BooleanField(default=False)
     account_type = models.IntegerField(choices=ACCOUNT_TYPES, default=0)
 
     following_artists = models.ManyToManyField(
-        "self", related_name="followers", symmetrical=False, blank=True
+        "self",
+        through="Follow",
+        related_name="followers",
+        symmetrical=False,
+        blank=True,
     )
+    # Maintained by services.counters, repaired by manage.py reconcile_counters
+    follower_count = models.PositiveIntegerField(default=0)
+    # Also set by the F() updates of the counters, see conditional
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Artist listings and searches by name
+            models.Index(
+                fields=["account_type", "showed_name"], name="profile_type_name_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.user.username
@@ -50,18 +74,32 @@ class UserProfile(models.Model):
             self.profile_picture_path
             and self.profile_picture_path.name != DEFAULT_PROFILE_PICTURE
         ):
-            if os.path.isfile(self.profile_picture_path.path):
-                try:
-                    os.remove(self.profile_picture_path)
-                    logger.info(
-                        f"Profile picture deleted : {self.profile_picture_path}"
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Error when deleting : {self.profile_picture_path} : {e}"
-                    )
+            # Queued for manage.py reap_files, once no other row uses it
+            release_file(self.profile_picture_path)
+            logger.info(
+                f"Profile picture queued for deletion : {self.profile_picture_path}"
+            )
 
 
 @receiver(post_delete, sender=UserProfile)
 def delete_user_profile_files(sender, instance, **kwargs):
     instance.delete_files()
+
+
+@receiver(pre_save, sender=UserProfile)
+def find_replaced_profile_files(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    if not raw:
+        # The default picture is shared by every profile and never released
+        instance._replaced_files = find_replaced_files(
+            instance,
+            ("profile_picture_path",),
+            update_fields,
+            keep=(DEFAULT_PROFILE_PICTURE,),
+        )
+
+
+@receiver(post_save, sender=UserProfile)
+def release_replaced_profile_files(sender, instance, **kwargs):
+    release_replaced_files(instance)
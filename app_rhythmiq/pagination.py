@@ -0,0 +1,208 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from drf_yasg import openapi
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple("KeysetCursor", ["position", "reverse"])
+
+SEARCH_PAGINATION_PARAMETERS = [
+    openapi.Parameter(
+        "limit",
+        openapi.IN_QUERY,
+        description="Number of results to return (default: 10)",
+        type=openapi.TYPE_INTEGER,
+    ),
+    openapi.Parameter(
+        "offset",
+        openapi.IN_QUERY,
+        description="Index of the first result to return",
+        type=openapi.TYPE_INTEGER,
+    ),
+]
+
+
+def add_side_tables(response, data):
+    """
+    Add the side tables of a normalized page (see SongNormalizedListSerializer)
+    next to its results.
+    """
+    side_tables = getattr(getattr(data, "serializer", None), "side_tables", None)
+    if side_tables:
+        response.data.update(side_tables)
+    return response
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination seeking on every field of the ordering, e.g. (-created_at, -id).
+
+    DRF's CursorPagination only seeks on the first field and skips ties with an
+    offset, so pages deep inside a tie (all the songs with 0 streams) cost as much
+    as an OFFSET. The cursor here stores the values of the whole ordering for the
+    boundary row and the next page is fetched with a keyset comparison, so any page
+    costs the same as the first one.
+
+    Views choose the ordering with a ``get_keyset_ordering()`` method or a
+    ``keyset_ordering`` attribute. The last field must be unique.
+    """
+
+    ordering = ("pk",)
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.ordering_fields = self.get_ordering_fields(queryset)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self.get_seek_filter(ordering, self.cursor.position)
+            )
+
+        # Fetch one extra row to know whether there is a following page
+        results = list(queryset[: self.page_size + 1])
+        has_following = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_paginated_response(self, data):
+        return add_side_tables(super().get_paginated_response(data), data)
+
+    def get_ordering(self, request, queryset, view):
+        get_keyset_ordering = getattr(view, "get_keyset_ordering", None)
+        if get_keyset_ordering is not None:
+            ordering = get_keyset_ordering()
+        else:
+            ordering = getattr(view, "keyset_ordering", None)
+        return tuple(ordering or self.ordering)
+
+    def get_ordering_fields(self, queryset):
+        """The model field, or the output field of the annotation, of the ordering."""
+        fields = []
+        for name in self.ordering:
+            name = name.lstrip("-")
+            if name in queryset.query.annotations:
+                fields.append(queryset.query.annotations[name].output_field)
+            elif name == "pk":
+                fields.append(queryset.model._meta.pk)
+            else:
+                fields.append(queryset.model._meta.get_field(name))
+        return fields
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self.get_position(self.page[-1])
+        return self.encode_cursor(KeysetCursor(position=position, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self.get_position(self.page[0])
+        return self.encode_cursor(KeysetCursor(position=position, reverse=True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            position = payload["p"]
+            reverse = bool(payload.get("r", False))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Tampered values would fail in the query, with a 500
+        try:
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.ordering_fields, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return KeysetCursor(position=position, reverse=reverse)
+
+    def encode_cursor(self, cursor):
+        payload = {"p": cursor.position}
+        if cursor.reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            if isinstance(value, (datetime.date, datetime.time)):
+                # Keep the microseconds, the next page would repeat rows otherwise
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}" for field in ordering
+        )
+
+    @staticmethod
+    def get_seek_filter(ordering, position):
+        """
+        Build the condition selecting the rows after ``position`` in ``ordering``.
+
+        (a, b) after (x, y) is expanded to ``a >= x AND (a > x OR (a = x AND b > y))``,
+        the redundant ``a >= x`` bound lets the database seek in the index.
+        """
+        first = ordering[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        seek = Q()
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{f"{field.lstrip('-')}__{lookup}": position[index]})
+            for previous_field, value in zip(ordering[:index], position):
+                condition &= Q(**{previous_field.lstrip("-"): value})
+            seek |= condition
+        return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & seek
+
+
+class SearchPagination(LimitOffsetPagination):
+    """Pages of ranked search results, which have no stable keyset to seek on."""
+
+    default_limit = 10
+    max_limit = 100
+
+    def get_paginated_response(self, data):
+        return add_side_tables(super().get_paginated_response(data), data)
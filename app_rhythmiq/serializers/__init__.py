@@ -1,8 +1,19 @@
 from .downloaded_song import DownloadedSongSerializer
 from .genre import GenreSerializer
 
-from .like import LikeSerializer
+from .like import LikeBatchSerializer, LikeSerializer
 
-from .playlist import PlaylistSerializer
-from .song import SongReadSerializer, SongCreateSerializer
-from .user_profile import UserProfileSerializer, UserSerializer, ArtistSerializer
+from .playlist import PlaylistSerializer, PlaylistSyncSerializer
+from .song import (
+    SongReadSerializer,
+    SongCreateSerializer,
+    SongNormalizedSerializer,
+    get_song_read_serializer_class,
+)
+from .song_rendition import SongRenditionSerializer
+from .user_profile import (
+    UserProfileSerializer,
+    UserSerializer,
+    ArtistSerializer,
+    FollowBatchSerializer,
+)
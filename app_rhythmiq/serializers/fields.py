@@ -0,0 +1,30 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+
+class SrcsetField(serializers.Field):
+    """
+    Read-only map of image width to URL, from the derivatives built by
+    services.images: ``{"64": "http://.../derivatives/ab/ab12...-64.webp", ...}``.
+    """
+
+    def __init__(self, image_field, derivatives_field, **kwargs):
+        kwargs["read_only"] = True
+        kwargs["source"] = "*"
+        self.image_field = image_field
+        self.derivatives_field = derivatives_field
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        derivatives = getattr(instance, self.derivatives_field) or {}
+        # Derivatives of a replaced image are not served
+        if not image or derivatives.get("source") != image.name:
+            return {}
+
+        request = self.context.get("request")
+        srcset = {}
+        for size, name in derivatives.get("sizes", {}).items():
+            url = default_storage.url(name)
+            srcset[size] = request.build_absolute_uri(url) if request else url
+        return srcset
@@ -11,3 +11,24 @@ class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
         fields = "__all__"
+
+
+class LikeBatchSerializer(serializers.Serializer):
+    """Songs to like and unlike in one request, e.g. from an offline queue."""
+
+    BATCH_LIMIT = 500
+
+    like = serializers.ListField(
+        child=serializers.IntegerField(), max_length=BATCH_LIMIT, default=list
+    )
+    unlike = serializers.ListField(
+        child=serializers.IntegerField(), max_length=BATCH_LIMIT, default=list
+    )
+
+    def validate(self, data):
+        both = set(data["like"]) & set(data["unlike"])
+        if both:
+            raise serializers.ValidationError(
+                f"Songs can't be liked and unliked at once: {sorted(both)}."
+            )
+        return data
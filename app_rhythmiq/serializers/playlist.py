@@ -1,12 +1,26 @@
 from rest_framework import serializers
 from ..models import Playlist, Song
+from ..services import playlists
 from .user_profile import UserProfileSerializer
+from .fields import SrcsetField
+
+
+class PlaylistSongsField(serializers.ManyRelatedField):
+    """The song ids of a playlist, in playlist order."""
+
+    def get_attribute(self, instance):
+        return [entry.song_id for entry in instance.entries.all()]
+
+    def to_representation(self, song_ids):
+        return song_ids
 
 
 class PlaylistSerializer(serializers.ModelSerializer):
     creator_user = UserProfileSerializer(read_only=True)
-    songs = serializers.PrimaryKeyRelatedField(
-        queryset=Song.objects.all(), many=True, required=False
+    cover_srcset = SrcsetField("cover_image_path", "cover_derivatives")
+    songs = PlaylistSongsField(
+        child_relation=serializers.PrimaryKeyRelatedField(queryset=Song.objects.all()),
+        required=False,
     )
 
     class Meta:
@@ -16,6 +30,43 @@ class PlaylistSerializer(serializers.ModelSerializer):
             "name",
             "creator_user",
             "cover_image_path",
+            "cover_srcset",
             "songs",
+            "track_count",
+            "follower_count",
+            "private",
+        ]
+        read_only_fields = ["track_count", "follower_count"]
+
+    def create(self, validated_data):
+        songs = validated_data.pop("songs", None)
+        playlist = super().create(validated_data)
+        if songs is not None:
+            playlists.set_songs(playlist, [song.id for song in songs])
+        return playlist
+
+    def update(self, instance, validated_data):
+        songs = validated_data.pop("songs", None)
+        playlist = super().update(instance, validated_data)
+        if songs is not None:
+            playlists.set_songs(playlist, [song.id for song in songs])
+        return playlist
+
+
+class PlaylistSyncSerializer(PlaylistSerializer):
+    """A playlist of the delta sync, which sends its songs separately."""
+
+    class Meta:
+        model = Playlist
+        fields = [
+            "id",
+            "name",
+            "cover_image_path",
+            "cover_srcset",
+            "track_count",
+            "follower_count",
             "private",
+            "created_at",
+            "updated_at",
         ]
+        read_only_fields = fields
@@ -1,17 +1,51 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from django.db import models
 
 from ..models import Song, Genre, UserProfile, Like
 from .user_profile import ArtistSerializer
 from .genre import GenreSerializer
+from .song_rendition import SongRenditionSerializer
+from .fields import SrcsetField
+from ..services import transcoding
 
-import audioread
-import tempfile
+ANNOTATED_TIMESTAMPS = ("liked_at", "downloaded_at", "published_at")
+ANNOTATED_VALUES = ("feed_reason", "similarity")
+TIMESTAMP_FIELD = serializers.DateTimeField()
+
+
+class SongListSerializer(serializers.ListSerializer):
+    """
+    Serialize a page of songs, loading the liked state of the whole page in one query.
+    """
+
+    def to_representation(self, data):
+        songs = list(
+            data.all() if isinstance(data, models.manager.BaseManager) else data
+        )
+        self.child.liked_song_ids = self.get_liked_song_ids(songs)
+        try:
+            return [self.child.to_representation(song) for song in songs]
+        finally:
+            self.child.liked_song_ids = None
+
+    def get_liked_song_ids(self, songs):
+        request = self.context.get("request")
+        if not songs or request is None or not request.user.is_authenticated:
+            return set()
+        return set(
+            Like.objects.filter(
+                user_id=request.user.id, song_id__in=[song.id for song in songs]
+            ).values_list("song_id", flat=True)
+        )
 
 
 class SongReadSerializer(serializers.ModelSerializer):
     artists = ArtistSerializer(many=True)
     is_liked = serializers.SerializerMethodField()
+    cover_srcset = SrcsetField("cover_image_path", "cover_derivatives")
+    renditions = SongRenditionSerializer(many=True, read_only=True)
+    rendition = serializers.SerializerMethodField()
 
     class Meta:
         model = Song
@@ -19,26 +53,74 @@ class SongReadSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "cover_image_path",
+            "cover_srcset",
             "description",
             "song_path",
             "created_at",
             "duration",
+            "bitrate",
+            "sample_rate",
+            "channels",
             "streaming_numbers",
+            "like_count",
             "artists",
             "genres",
+            "status",
+            "renditions",
+            "rendition",
             "is_liked",
         ]
-        read_only_fields = ["created_at", "streaming_numbers"]
+        read_only_fields = ["created_at", "streaming_numbers", "like_count", "status"]
+        list_serializer_class = SongListSerializer
+
+    # Filled by SongListSerializer while it serializes a page of songs
+    liked_song_ids = None
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Prefetch the relations read by this serializer."""
+        return queryset.prefetch_related("artists__user", "genres", "renditions")
 
     def get_is_liked(self, obj):
-        user = self.context.get("request").user
+        if self.liked_song_ids is not None:
+            return obj.id in self.liked_song_ids
+        request = self.context.get("request")
+        if request is None:
+            return False
+        user = request.user
         if user.is_authenticated:
             # Check if the user liked this song
             return Like.objects.filter(user=user.userprofile, song=obj).exists()
         return False
 
+    def get_rendition(self, obj):
+        """The rendition streamed for the ``quality`` parameter, None for the upload."""
+        request = self.context.get("request")
+        quality = request.query_params.get("quality") if request else None
+        try:
+            rendition = transcoding.select_rendition(obj, quality)
+        except ValueError:
+            rendition = transcoding.select_rendition(obj)
+        if rendition is None:
+            return None
+        return SongRenditionSerializer(rendition, context=self.context).data
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
+        self.represent_relations(instance, representation)
+
+        # Set by the liked_songs, downloaded_songs, feed and similar queries
+        for timestamp in ANNOTATED_TIMESTAMPS:
+            if hasattr(instance, timestamp):
+                representation[timestamp] = TIMESTAMP_FIELD.to_representation(
+                    getattr(instance, timestamp)
+                )
+        for field in ANNOTATED_VALUES:
+            if hasattr(instance, field):
+                representation[field] = getattr(instance, field)
+        return representation
+
+    def represent_relations(self, instance, representation):
         artists = representation.get("artists")
         if artists is None:
             artists = []  # Default to an empty list if artists is None
@@ -48,9 +130,69 @@ class SongReadSerializer(serializers.ModelSerializer):
         representation["artists"] = filtered_artists
         genres = instance.genres.all()
         representation["genres"] = [genre.name for genre in genres]
+
+
+class SongNormalizedListSerializer(SongListSerializer):
+    """
+    Serialize a page of songs referencing their artists and genres by id, each
+    artist and genre of the page serialized once in ``side_tables``.
+    """
+
+    side_tables = None
+
+    def to_representation(self, data):
+        songs = list(
+            data.all() if isinstance(data, models.manager.BaseManager) else data
+        )
+        representation = super().to_representation(songs)
+        artists = {}
+        genres = {}
+        for song in songs:
+            for artist in song.artists.all():
+                if artist.account_type == 2:
+                    artists.setdefault(artist.pk, artist)
+            for genre in song.genres.all():
+                genres.setdefault(genre.pk, genre)
+        self.side_tables = {
+            "artists": ArtistSerializer(
+                artists.values(), many=True, context=self.context
+            ).data,
+            "genres": GenreSerializer(genres.values(), many=True).data,
+        }
         return representation
 
 
+class SongNormalizedSerializer(SongReadSerializer):
+    """
+    The songs of SongReadSerializer with the ids of their artists (the id of
+    their user) and genres, for pages repeating the same artists many times.
+    """
+
+    artists = serializers.SerializerMethodField()
+    genres = serializers.SerializerMethodField()
+
+    class Meta(SongReadSerializer.Meta):
+        list_serializer_class = SongNormalizedListSerializer
+
+    def get_artists(self, obj):
+        # Filtered in Python, the artists are prefetched
+        return [artist.pk for artist in obj.artists.all() if artist.account_type == 2]
+
+    def get_genres(self, obj):
+        return [genre.pk for genre in obj.genres.all()]
+
+    def represent_relations(self, instance, representation):
+        # Already ids, see get_artists and get_genres
+        pass
+
+
+def get_song_read_serializer_class(request):
+    """The serializer of the ``shape`` query parameter of a list of songs."""
+    if request is not None and request.query_params.get("shape") == "normalized":
+        return SongNormalizedSerializer
+    return SongReadSerializer
+
+
 class SongCreateSerializer(serializers.ModelSerializer):
     artists = serializers.PrimaryKeyRelatedField(
         queryset=UserProfile.objects.all(), many=True
@@ -66,11 +208,19 @@ class SongCreateSerializer(serializers.ModelSerializer):
             "description",
             "song_path",
             "duration",
+            "bitrate",
+            "sample_rate",
+            "channels",
             "artists",
             "genres",
+            "status",
         ]
         extra_kwargs = {
             "duration": {"read_only": True},
+            "bitrate": {"read_only": True},
+            "sample_rate": {"read_only": True},
+            "channels": {"read_only": True},
+            "status": {"read_only": True},
         }
 
     def validate(self, attrs):
@@ -78,16 +228,7 @@ class SongCreateSerializer(serializers.ModelSerializer):
         if not song_file:
             raise ValidationError({"error": "No song file provided."})
 
-        # Extract duration
-        duration = self.extract_audio_duration(song_file)
-        if duration is None:
-            raise ValidationError(
-                {
-                    "error": "Unable to extract duration. Ensure it's a valid MP3 or WAV file."
-                }
-            )
-
-        attrs["duration"] = duration
+        # The audio metadata is probed by SongViewSet.perform_create
         return attrs
 
     def validate_artists(self, artists):
@@ -100,23 +241,3 @@ class SongCreateSerializer(serializers.ModelSerializer):
                 f"The following users are not artists: {invalid_usernames}"
             )
         return artists
-
-    def extract_audio_duration(self, file):
-        try:
-            # Create a temporary file to store the uploaded file
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                for chunk in file.chunks():
-                    temp_file.write(chunk)
-                temp_file_path = temp_file.name
-
-            with audioread.audio_open(temp_file_path) as audio_file:
-                duration_in_seconds = audio_file.duration
-                if duration_in_seconds > 3599:
-                    raise ValueError(
-                        "Audio duration exceeds the 59 minute 59 second limit."
-                    )
-
-                return duration_in_seconds
-
-        except Exception as e:
-            return None
@@ -0,0 +1,8 @@
+from rest_framework import serializers
+from ..models import SongRendition
+
+
+class SongRenditionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SongRendition
+        fields = ["id", "codec", "bitrate", "size", "file"]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from ..models import UserProfile
+from .fields import SrcsetField
 
 
 from django.contrib.auth.models import User
@@ -26,6 +27,9 @@ class UserSerializer(serializers.ModelSerializer):
 class ArtistSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     profile_picture_path = serializers.ImageField()
+    profile_picture_srcset = SrcsetField(
+        "profile_picture_path", "profile_picture_derivatives"
+    )
 
     class Meta:
         model = UserProfile
@@ -33,9 +37,11 @@ class ArtistSerializer(serializers.ModelSerializer):
             "user",
             "showed_name",
             "profile_picture_path",
+            "profile_picture_srcset",
             "account_type",
+            "follower_count",
         ]
-        read_only_fields = ["user"]
+        read_only_fields = ["user", "follower_count"]
 
     def to_representation(self, instance):
         if instance.account_type == 2:
@@ -49,6 +55,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
     )
     user = UserSerializer(read_only=True)
     following_artists = ArtistSerializer(many=True, required=False)
+    profile_picture_srcset = SrcsetField(
+        "profile_picture_path", "profile_picture_derivatives"
+    )
 
     class Meta:
         model = UserProfile
@@ -56,12 +65,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "user",
             "showed_name",
             "profile_picture_path",
+            "profile_picture_srcset",
             "private",
             "following_artists",
             "account_type",
             "account_type_text",
+            "follower_count",
         ]
-        read_only_fields = ["user"]
+        read_only_fields = ["user", "follower_count"]
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -69,3 +80,24 @@ class UserProfileSerializer(serializers.ModelSerializer):
             representation["following_artists"] = []
 
         return representation
+
+
+class FollowBatchSerializer(serializers.Serializer):
+    """Artists to follow and unfollow in one request, e.g. from an offline queue."""
+
+    BATCH_LIMIT = 500
+
+    follow = serializers.ListField(
+        child=serializers.IntegerField(), max_length=BATCH_LIMIT, default=list
+    )
+    unfollow = serializers.ListField(
+        child=serializers.IntegerField(), max_length=BATCH_LIMIT, default=list
+    )
+
+    def validate(self, data):
+        both = set(data["follow"]) & set(data["unfollow"])
+        if both:
+            raise serializers.ValidationError(
+                f"Artists can't be followed and unfollowed at once: {sorted(both)}."
+            )
+        return data
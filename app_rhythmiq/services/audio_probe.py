@@ -0,0 +1,84 @@
+"""
+Audio metadata read from the container headers.
+
+Mutagen only parses the headers of the file (the RIFF chunks of a WAV, the
+first frames and Xing/VBRI header of an MP3, the STREAMINFO block of a FLAC,
+the first pages of an Ogg stream). The audio is never decoded, and an upload is
+probed where it already is, in memory or in its temporary file, without copying
+it.
+"""
+
+from dataclasses import dataclass
+
+from django.core.files.base import File
+from mutagen import File as MutagenFile
+from mutagen.flac import FLAC
+from mutagen.mp3 import MP3
+from mutagen.oggopus import OggOpus
+from mutagen.oggvorbis import OggVorbis
+from mutagen.wave import WAVE
+
+MAX_DURATION = 3599
+
+FORMATS = {
+    MP3: "mp3",
+    WAVE: "wav",
+    FLAC: "flac",
+    OggVorbis: "ogg",
+    OggOpus: "ogg",
+}
+
+INVALID_FILE = "The file is not a valid MP3, WAV, FLAC or OGG audio file."
+
+
+class ProbeError(Exception):
+    """The file is not a supported audio file, or too long."""
+
+
+@dataclass(frozen=True)
+class AudioInfo:
+    format: str
+    duration: float
+    bitrate: int | None
+    sample_rate: int | None
+    channels: int | None
+
+    def as_song_fields(self):
+        """The values of the matching Song fields."""
+        return {
+            "duration": round(self.duration),
+            "bitrate": self.bitrate,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+        }
+
+
+def probe(file, max_duration=MAX_DURATION):
+    """
+    Read the format, duration, bitrate, sample rate and channels of an audio file.
+
+    ``file`` is a path, or a Django file such as an upload or a FieldFile, which
+    is rewound before and after probing.
+    """
+    if isinstance(file, File):
+        file.seek(0)
+    try:
+        audio = MutagenFile(file, options=list(FORMATS))
+    except Exception:
+        audio = None
+    finally:
+        if isinstance(file, File):
+            file.seek(0)
+
+    if audio is None or not audio.info.length:
+        raise ProbeError(INVALID_FILE)
+    if audio.info.length > max_duration:
+        raise ProbeError("Audio duration exceeds the 59 minute 59 second limit.")
+
+    return AudioInfo(
+        format=FORMATS[type(audio)],
+        duration=audio.info.length,
+        bitrate=getattr(audio.info, "bitrate", None) or None,
+        sample_rate=getattr(audio.info, "sample_rate", None),
+        channels=getattr(audio.info, "channels", None),
+    )
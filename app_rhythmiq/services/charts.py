@@ -0,0 +1,218 @@
+"""
+Precomputed song charts.
+
+Each chart keeps the top ``CHART_SIZE`` songs of a ranking in the SongChart
+table: most streamed overall, new releases and most streamed per genre, for
+songs released in any time window. ``filter_songs`` reads these rows instead
+of sorting the catalog on every request.
+
+Each build is recorded in SongChartBuild, so an empty chart is served as
+empty rather than ranked from the catalog as if it had never been built.
+
+Charts are refreshed by ``manage.py rebuild_charts`` and, for the charts the
+flushed songs are in or can now enter, after every stream counter flush.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ..caching import bump_version
+from ..models import Genre, Song, SongChart, SongChartBuild
+
+CHART_SIZE = 100
+
+WINDOWS = {
+    "all": None,
+    "month": timedelta(days=30),
+    "week": timedelta(days=7),
+}
+
+
+def get_ranking(kind, window="all", genre=None):
+    songs = Song.objects.filter(status=Song.READY)
+    if WINDOWS[window] is not None:
+        songs = songs.filter(created_at__gte=timezone.now() - WINDOWS[window])
+    if kind == "new":
+        return songs.order_by("-created_at", "-streaming_numbers", "-id")
+    if genre is not None:
+        songs = songs.filter(genres=genre)
+    return songs.order_by("-streaming_numbers", "-id")
+
+
+def refresh_chart(kind, window="all", genre=None):
+    """Replace the rows of one chart with the current top songs."""
+    top = get_ranking(kind, window, genre).values_list("id", "streaming_numbers")
+    refreshed_at = timezone.now()
+    entries = [
+        SongChart(
+            kind=kind,
+            window=window,
+            genre=genre,
+            position=position,
+            song_id=song_id,
+            streaming_numbers=streaming_numbers,
+            refreshed_at=refreshed_at,
+        )
+        for position, (song_id, streaming_numbers) in enumerate(
+            top[:CHART_SIZE], start=1
+        )
+    ]
+
+    with transaction.atomic():
+        SongChart.objects.filter(kind=kind, window=window, genre=genre).delete()
+        SongChart.objects.bulk_create(entries)
+        SongChartBuild.objects.filter(kind=kind, window=window, genre=genre).delete()
+        SongChartBuild.objects.create(
+            kind=kind, window=window, genre=genre, refreshed_at=refreshed_at
+        )
+
+
+def can_change(kind, window, genre, songs):
+    """
+    Whether the streams of ``songs``, ``(id, streaming_numbers)`` pairs of songs
+    in the chart's window and genre, can change a built chart: they are in it,
+    or it has room for them, or they now outrank its last entry.
+    """
+    if not songs:
+        return False
+    if not is_built(kind, window, (genre,)):
+        return True
+    entries = list(
+        SongChart.objects.filter(kind=kind, window=window, genre=genre)
+        .order_by("position")
+        .values_list("song_id", "streaming_numbers")
+    )
+    if len(entries) < CHART_SIZE:
+        return True
+    chart_ids = {song_id for song_id, _ in entries}
+    last_song_id, last_streams = entries[-1]
+    return any(
+        song_id in chart_ids or (streams, song_id) > (last_streams, last_song_id)
+        for song_id, streams in songs
+    )
+
+
+def refresh_charts(song_ids=None):
+    """
+    Refresh every chart, or only the charts whose ranking the new streams of the
+    given songs can change. The new releases are ranked by release date, which
+    streams don't change, so they are left to ``refresh_new_releases``.
+    """
+    if song_ids is None:
+        for window in WINDOWS:
+            refresh_chart("global", window)
+            refresh_chart("new", window)
+            for genre in Genre.objects.all():
+                refresh_chart("genre", window, genre)
+        bump_version("songs")
+        return
+
+    songs = list(
+        Song.objects.filter(pk__in=list(song_ids), status=Song.READY).values_list(
+            "id", "streaming_numbers", "created_at"
+        )
+    )
+    song_genres = {}
+    for song_id, genre_id in Song.genres.through.objects.filter(
+        song_id__in=[song_id for song_id, _, _ in songs]
+    ).values_list("song_id", "genre_id"):
+        song_genres.setdefault(song_id, set()).add(genre_id)
+    genres = Genre.objects.in_bulk(set().union(*song_genres.values()))
+
+    now = timezone.now()
+    for window, period in WINDOWS.items():
+        in_window = [
+            (song_id, streams)
+            for song_id, streams, created_at in songs
+            if period is None or created_at >= now - period
+        ]
+        if can_change("global", window, None, in_window):
+            refresh_chart("global", window)
+        for genre_id, genre in genres.items():
+            in_genre = [
+                (song_id, streams)
+                for song_id, streams in in_window
+                if genre_id in song_genres.get(song_id, ())
+            ]
+            if can_change("genre", window, genre, in_genre):
+                refresh_chart("genre", window, genre)
+    # The responses show the new streaming numbers, even if no chart changed
+    bump_version("songs")
+
+
+def refresh_new_releases():
+    for window in WINDOWS:
+        refresh_chart("new", window)
+    bump_version("songs")
+
+
+def is_built(kind, window="all", genres=(None,)):
+    """Whether the charts of ``kind`` and ``window`` were built for every genre."""
+    built = set(
+        SongChartBuild.objects.filter(kind=kind, window=window).values_list(
+            "genre_id", flat=True
+        )
+    )
+    return all((genre.pk if genre else None) in built for genre in genres)
+
+
+def read_chart(kind, window="all", genre=None, limit=10):
+    """
+    Return the ids of the top songs of a chart, None if it was never built.
+    """
+    song_ids = list(
+        SongChart.objects.filter(kind=kind, window=window, genre=genre)
+        .order_by("position")
+        .values_list("song_id", flat=True)[:limit]
+    )
+    if not song_ids and not is_built(kind, window, (genre,)):
+        return None
+    return song_ids
+
+
+def read_genre_charts(genre_names, window="all", limit=10):
+    """
+    Merge the charts of several genres, None if one of them was never built.
+
+    Songs in more of the requested genres come first, then the most streamed.
+    A song only counts for a genre if it is in that genre's top ``CHART_SIZE``.
+    """
+    genres = list(Genre.objects.filter(name__in=genre_names))
+    if not is_built("genre", window, genres):
+        return None
+    entries = SongChart.objects.filter(
+        kind="genre", window=window, genre__in=genres
+    ).values_list("song_id", "streaming_numbers")
+
+    relevance = {}
+    streaming_numbers = {}
+    for song_id, streams in entries:
+        relevance[song_id] = relevance.get(song_id, 0) + 1
+        streaming_numbers[song_id] = streams
+
+    ranking = sorted(
+        relevance,
+        key=lambda song_id: (
+            -relevance[song_id],
+            -streaming_numbers[song_id],
+            -song_id,
+        ),
+    )
+    return ranking[:limit]
+
+
+def get_genre_ranking(genre_names, window="all"):
+    """Rank the catalog like ``read_genre_charts``, without the precomputed charts."""
+    songs = Song.objects.filter(status=Song.READY, genres__name__in=genre_names)
+    if WINDOWS[window] is not None:
+        songs = songs.filter(created_at__gte=timezone.now() - WINDOWS[window])
+    return (
+        songs.annotate(
+            relevance=Count("genres", filter=Q(genres__name__in=genre_names))
+        )
+        .order_by("-relevance", "-streaming_numbers", "-id")
+        .distinct()
+    )
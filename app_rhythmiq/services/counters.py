@@ -0,0 +1,94 @@
+"""
+Denormalized counters.
+
+``Song.like_count``, ``UserProfile.follower_count``, ``Playlist.track_count`` and
+``Playlist.follower_count`` are kept next to the rows they count, so lists and
+profiles read them instead of aggregating. The views and services changing the
+counted rows adjust them with an ``F()`` update in the same transaction, which
+also sets the ``updated_at`` of the row (the ETags of the views are built from it).
+
+Rows removed by a cascade (a deleted song drops its likes and playlist entries)
+or edited in the admin are not counted, ``manage.py reconcile_counters``
+recounts them and repairs the drift in bulk.
+"""
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Now
+from django.utils import timezone
+
+from ..caching import bump_version
+from ..models import Follow, Like, Playlist, PlaylistEntry, Song, UserProfile
+
+UPDATE_BATCH_SIZE = 500
+
+# The counter field, the counted model and its foreign key to the counter's model
+COUNTERS = [
+    (Song, "like_count", Like, "song"),
+    (UserProfile, "follower_count", Follow, "to_userprofile"),
+    (Playlist, "track_count", PlaylistEntry, "playlist"),
+    (Playlist, "follower_count", Playlist.followers.through, "playlist"),
+]
+
+
+def increment(model, pk, field, delta=1):
+    """Add ``delta`` to a counter, never going below 0."""
+    if delta:
+        model.objects.filter(pk=pk).update(
+            **{field: Greatest(F(field) + delta, 0)}, updated_at=Now()
+        )
+
+
+def increment_many(model, pks, field, delta=1):
+    """Add ``delta`` to a counter of the rows ``pks``, in one UPDATE."""
+    if delta and pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, 0)}, updated_at=Now()
+        )
+
+
+def count_of(counted_model, key):
+    """The number of ``counted_model`` rows pointing to the outer row."""
+    return Coalesce(
+        Subquery(
+            counted_model.objects.filter(**{key: OuterRef("pk")})
+            .order_by()
+            .values(key)
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def find_drift(model, field, counted_model, key):
+    """The (pk, actual count) of the rows whose counter is wrong."""
+    return (
+        model.objects.annotate(actual=count_of(counted_model, key))
+        .exclude(**{field: F("actual")})
+        .values_list("pk", "actual")
+    )
+
+
+def reconcile(dry_run=False):
+    """
+    Recount every counter and repair the wrong ones.
+    Returns the number of wrong rows per counter, as ``{"Song.like_count": 3}``.
+    """
+    repaired = {}
+    for model, field, counted_model, key in COUNTERS:
+        drift = list(find_drift(model, field, counted_model, key).iterator())
+        if drift and not dry_run:
+            now = timezone.now()
+            model.objects.bulk_update(
+                [
+                    model(pk=pk, **{field: actual}, updated_at=now)
+                    for pk, actual in drift
+                ],
+                [field, "updated_at"],
+                batch_size=UPDATE_BATCH_SIZE,
+            )
+        repaired[f"{model.__name__}.{field}"] = len(drift)
+    if any(repaired.values()) and not dry_run:
+        # Song and profile responses embed the counters of the artists
+        bump_version("songs", "artists")
+    return repaired
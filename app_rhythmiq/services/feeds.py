@@ -0,0 +1,181 @@
+"""
+Home feeds.
+
+The feed of a user is a table of FeedItem rows, so reading it is one indexed
+query whatever the user follows. The rows are written ahead of the reads:
+
+- a song becoming ready is fanned out to the followers of its artists;
+- following an artist adds its latest songs, unfollowing removes them;
+- ``manage.py rebuild_feeds`` recomputes the feeds, adding the latest songs of
+  the genres each user likes and downloads the most, and caps every feed to
+  ``FEED_SIZE`` songs.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import FeedItem, Follow, Song, UserProfile
+
+# Songs kept per feed, newest first
+FEED_SIZE = 300
+# Genre songs picked from the last GENRE_WINDOW, in the top GENRE_COUNT genres
+GENRE_COUNT = 3
+GENRE_SONGS = 100
+GENRE_WINDOW = timedelta(days=90)
+BATCH_SIZE = 1000
+
+
+def add_items(items, reason):
+    """Insert feed items; a followed artist overrides a genre as the reason."""
+    if reason == FeedItem.FOLLOWED_ARTIST:
+        FeedItem.objects.bulk_create(
+            items,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["user", "song"],
+            update_fields=["reason"],
+        )
+    else:
+        FeedItem.objects.bulk_create(
+            items, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+
+
+def fan_out(song):
+    """Add a newly ready song to the feeds of the followers of its artists."""
+    follower_ids = (
+        Follow.objects.filter(to_userprofile__songs=song)
+        .values_list("from_userprofile_id", flat=True)
+        .distinct()
+    )
+    batch = []
+    for follower_id in follower_ids.iterator():
+        batch.append(
+            FeedItem(
+                user_id=follower_id,
+                song=song,
+                reason=FeedItem.FOLLOWED_ARTIST,
+                published_at=song.created_at,
+            )
+        )
+        if len(batch) == BATCH_SIZE:
+            add_items(batch, FeedItem.FOLLOWED_ARTIST)
+            batch = []
+    add_items(batch, FeedItem.FOLLOWED_ARTIST)
+
+
+def song_items(user_profile, songs, reason):
+    return [
+        FeedItem(
+            user=user_profile,
+            song_id=song_id,
+            reason=reason,
+            published_at=created_at,
+        )
+        for song_id, created_at in songs.values_list("id", "created_at")
+    ]
+
+
+def add_followed_artists(user_profile, artist_ids):
+    """Add the latest songs of newly followed artists to a feed."""
+    songs = (
+        Song.objects.filter(status=Song.READY, artists__in=artist_ids)
+        .distinct()
+        .order_by("-created_at", "-id")[:FEED_SIZE]
+    )
+    add_items(
+        song_items(user_profile, songs, FeedItem.FOLLOWED_ARTIST),
+        FeedItem.FOLLOWED_ARTIST,
+    )
+
+
+def remove_followed_artists(user_profile, artist_ids):
+    """Remove the songs of unfollowed artists not sung by another followed one."""
+    FeedItem.objects.filter(
+        user=user_profile,
+        reason=FeedItem.FOLLOWED_ARTIST,
+        song__artists__in=artist_ids,
+    ).exclude(
+        song__artists__in=Follow.objects.filter(from_userprofile=user_profile).values(
+            "to_userprofile_id"
+        )
+    ).delete()
+
+
+def favorite_genre_ids(user_profile, count=GENRE_COUNT):
+    """The genres of the songs a user likes and downloads, most frequent first."""
+    weights = Counter()
+    for song_filter in ("song__like__user", "song__downloadedsong__user"):
+        weights.update(
+            dict(
+                Song.genres.through.objects.filter(**{song_filter: user_profile})
+                .values("genre_id")
+                .annotate(count=Count("*"))
+                .values_list("genre_id", "count")
+            )
+        )
+    return [genre_id for genre_id, _ in weights.most_common(count)]
+
+
+def genre_songs(user_profile):
+    """The latest songs of the favorite genres of a user, not liked yet."""
+    genre_ids = favorite_genre_ids(user_profile)
+    if not genre_ids:
+        return Song.objects.none()
+    return (
+        Song.objects.filter(
+            status=Song.READY,
+            genres__in=genre_ids,
+            created_at__gte=timezone.now() - GENRE_WINDOW,
+        )
+        .exclude(like__user=user_profile)
+        .exclude(artists=user_profile)
+        .distinct()
+        .order_by("-created_at", "-id")[:GENRE_SONGS]
+    )
+
+
+def trim(user_profile, size=FEED_SIZE):
+    """Delete the items past the ``size`` newest of a feed."""
+    items = FeedItem.objects.filter(user=user_profile)
+    oldest_kept = (
+        items.order_by("-published_at", "-song_id")
+        .values_list("published_at", "song_id")[size - 1 : size]
+        .first()
+    )
+    if oldest_kept is not None:
+        published_at, song_id = oldest_kept
+        items.filter(published_at__lte=published_at).exclude(
+            published_at=published_at, song_id__gte=song_id
+        ).delete()
+
+
+@transaction.atomic
+def rebuild_feed(user_profile):
+    """Recompute the feed of a user from its follows, likes and downloads."""
+    FeedItem.objects.filter(user=user_profile).delete()
+    artist_ids = Follow.objects.filter(from_userprofile=user_profile).values(
+        "to_userprofile_id"
+    )
+    add_followed_artists(user_profile, artist_ids)
+    add_items(
+        song_items(user_profile, genre_songs(user_profile), FeedItem.GENRE),
+        FeedItem.GENRE,
+    )
+    trim(user_profile)
+
+
+def rebuild_feeds(user_ids=None):
+    """Rebuild the feeds of the given users, or of everyone. Returns how many."""
+    profiles = UserProfile.objects.order_by("pk")
+    if user_ids is not None:
+        profiles = profiles.filter(pk__in=user_ids)
+    rebuilt = 0
+    for user_profile in profiles.only("pk").iterator():
+        rebuild_feed(user_profile)
+        rebuilt += 1
+    return rebuilt
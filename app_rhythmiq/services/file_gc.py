@@ -0,0 +1,207 @@
+"""
+Deferred deletion of media files.
+
+Deleting a row doesn't touch the disk: its files are queued as
+PendingFileDeletion rows in the same transaction (see storage.release_file).
+``manage.py reap_files`` later deletes the queued files in batches, skipping the
+ones a row references again by then (the same content uploaded again).
+
+``find_orphans`` walks MEDIA_ROOT for the files no row references, such as the
+files of rows deleted before the queue existed or of uploads that failed
+halfway, so they can be queued too. The references are read from the file
+fields, not from the MediaBlob counts, which drift when a row is deleted
+without releasing its files: ``repair_ref_counts`` recounts them.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from ..models import (
+    MediaBlob,
+    PendingFileDeletion,
+    Playlist,
+    Song,
+    SongRendition,
+    UserProfile,
+)
+from ..models.user_profile import DEFAULT_PROFILE_PICTURE
+from ..storage import ContentAddressedStorage, queue_deletion
+
+logger = logging.getLogger(__name__)
+
+FILE_FIELDS = [
+    (Song, "song_path"),
+    (Song, "cover_image_path"),
+    (Playlist, "cover_image_path"),
+    (UserProfile, "profile_picture_path"),
+    (SongRendition, "file"),
+]
+
+DERIVATIVE_FIELDS = [
+    (Song, "cover_derivatives"),
+    (Playlist, "cover_derivatives"),
+    (UserProfile, "profile_picture_derivatives"),
+]
+
+
+def derivative_names():
+    """The names of every image derivative in use (see services.images)."""
+    names = set()
+    for model, field in DERIVATIVE_FIELDS:
+        for derivatives in model.objects.values_list(field, flat=True).iterator():
+            names.update((derivatives or {}).get("sizes", {}).values())
+    return names
+
+
+def referenced_names(names=None):
+    """The names in ``names``, or every name, that a row still references."""
+    if names is not None:
+        names = set(names)
+    used = set()
+
+    for model, field in FILE_FIELDS:
+        files = model.objects.exclude(**{field: ""}).exclude(
+            **{f"{field}__isnull": True}
+        )
+        if names is not None:
+            files = files.filter(**{f"{field}__in": names})
+        used.update(files.values_list(field, flat=True).iterator())
+
+    # Derivatives are only referenced from JSON, look them up if needed
+    if names is None or any(name.startswith("derivatives/") for name in names):
+        used.update(derivative_names())
+    used.add(DEFAULT_PROFILE_PICTURE)
+
+    return used if names is None else used & names
+
+
+def reap(batch_size=500):
+    """
+    Delete the files of the oldest queued deletions that are still unused.
+    Returns the number of files deleted and of queued deletions processed.
+    """
+    pending = list(PendingFileDeletion.objects.order_by("id")[:batch_size])
+    if not pending:
+        return 0, 0
+
+    names = {deletion.name for deletion in pending}
+    # Counted references without a row yet belong to uploads being saved
+    uploading = MediaBlob.objects.filter(name__in=names, ref_count__gt=0)
+    unused = (
+        names - referenced_names(names) - set(uploading.values_list("name", flat=True))
+    )
+    deleted = 0
+    for name in unused:
+        with transaction.atomic():
+            # Storing the same content again deletes these rows too (see
+            # ContentAddressedStorage.cancel_deletion): whoever deletes them
+            # first makes the other wait, the file is only deleted if we did
+            if not PendingFileDeletion.objects.filter(name=name).delete()[0]:
+                continue
+            try:
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                    deleted += 1
+            except SuspiciousFileOperation:
+                logger.warning("Not deleting %s, outside MEDIA_ROOT", name)
+
+    PendingFileDeletion.objects.filter(id__in=[p.id for p in pending]).delete()
+    return deleted, len(pending)
+
+
+def count_references(names=None):
+    """
+    The number of rows referencing each file of the content-addressed storage,
+    among ``names`` or every name.
+    """
+    counts = Counter()
+    for model, field in FILE_FIELDS:
+        if not isinstance(
+            model._meta.get_field(field).storage, ContentAddressedStorage
+        ):
+            continue
+        files = model.objects.exclude(**{field: ""}).exclude(
+            **{f"{field}__isnull": True}
+        )
+        if names is not None:
+            files = files.filter(**{f"{field}__in": names})
+        counts.update(files.values_list(field, flat=True).iterator())
+    return counts
+
+
+def find_ref_count_drift():
+    """The (name, ref_count, actual count) of the blobs counting wrong."""
+    counts = count_references()
+    return [
+        (name, ref_count, counts[name])
+        for name, ref_count in MediaBlob.objects.values_list(
+            "name", "ref_count"
+        ).iterator()
+        if ref_count != counts[name]
+    ]
+
+
+def repair_ref_counts(batch_size=500):
+    """
+    Set the reference count of the blobs counting wrong to the number of rows
+    using them, and queue the files no row uses for deletion.
+    Returns the number of blobs repaired.
+    """
+    names = [name for name, _, _ in find_ref_count_drift()]
+    repaired = 0
+    for start in range(0, len(names), batch_size):
+        batch = names[start : start + batch_size]
+        with transaction.atomic():
+            # Counted again under the lock, uploads may have committed since
+            blobs = MediaBlob.objects.select_for_update().filter(name__in=batch)
+            counts = count_references(batch)
+            wrong = [blob for blob in blobs if blob.ref_count != counts[blob.name]]
+            for blob in wrong:
+                blob.ref_count = counts[blob.name]
+            MediaBlob.objects.bulk_update(
+                [blob for blob in wrong if blob.ref_count], ["ref_count"]
+            )
+            unused = [blob.name for blob in wrong if not blob.ref_count]
+            MediaBlob.objects.filter(name__in=unused).delete()
+            queue_deletion(*unused)
+            repaired += len(wrong)
+    return repaired
+
+
+def find_orphans(grace_seconds=3600):
+    """
+    Yield the names of the files of MEDIA_ROOT that no row references.
+
+    Files modified in the last ``grace_seconds`` are skipped: they may belong to
+    an upload whose row is not committed yet.
+    """
+    root = str(settings.MEDIA_ROOT)
+    cutoff = time.time() - grace_seconds
+    used = referenced_names()
+
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, "/")
+            if name in used:
+                continue
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield name
+
+
+def queue_orphans(grace_seconds=3600):
+    """Queue the orphaned files for deletion. Returns how many were queued."""
+    orphans = list(find_orphans(grace_seconds))
+    queue_deletion(*orphans)
+    return len(orphans)
@@ -0,0 +1,84 @@
+"""
+Following and unfollowing artists.
+
+Both write the ``following_artists`` through table directly: a follow is an
+INSERT of the follows not there yet, an unfollow a DELETE, both under a lock of
+the artists, so they are idempotent and never load the followed artists. Either keeps
+``UserProfile.follower_count``, the feed of the user and the tombstones of the
+delta sync up to date in the same transaction.
+"""
+
+from django.db import transaction
+
+from ..caching import bump_version
+from ..models import Follow, Tombstone, UserProfile
+from . import counters, feeds, sync
+
+
+def artist_ids(user_profile, ids):
+    """
+    The ids of ``ids`` that are artists the user can follow, locked until the
+    end of the transaction: concurrent follows of an artist read the existing
+    follows one after the other and count each new follow once.
+    """
+    return list(
+        UserProfile.objects.select_for_update()
+        .filter(pk__in=set(ids), account_type=2)
+        .exclude(pk=user_profile.pk)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+@transaction.atomic
+def follow_artists(user_profile, ids):
+    """Follow the artists of ``ids``. Returns the ids of the artists followed."""
+    ids = artist_ids(user_profile, ids)
+    if ids:
+        # The insert doesn't tell which follows are new, read the existing ones first
+        followed_ids = set(
+            Follow.objects.filter(
+                from_userprofile=user_profile, to_userprofile_id__in=ids
+            ).values_list("to_userprofile_id", flat=True)
+        )
+        new_ids = [artist_id for artist_id in ids if artist_id not in followed_ids]
+        Follow.objects.bulk_create(
+            [
+                Follow(from_userprofile=user_profile, to_userprofile_id=artist_id)
+                for artist_id in new_ids
+            ],
+            ignore_conflicts=True,
+        )
+        counters.increment_many(UserProfile, new_ids, "follower_count")
+        feeds.add_followed_artists(user_profile, ids)
+        # Song and profile responses embed the follower counts of the artists
+        bump_version("songs", "artists")
+    return ids
+
+
+@transaction.atomic
+def unfollow_artists(user_profile, ids):
+    """Stop following the artists of ``ids``. Returns how many were unfollowed."""
+    follows = Follow.objects.filter(
+        from_userprofile=user_profile, to_userprofile_id__in=set(ids)
+    )
+    # Locked, so the counters are decremented for the follows this delete removes
+    ids = list(follows.select_for_update().values_list("to_userprofile_id", flat=True))
+    if not ids:
+        return 0
+    removed, _ = follows.filter(to_userprofile_id__in=ids).delete()
+    if removed:
+        counters.increment_many(UserProfile, ids, "follower_count", -1)
+        feeds.remove_followed_artists(user_profile, ids)
+        sync.bury(user_profile.pk, Tombstone.FOLLOW, ids)
+        bump_version("songs", "artists")
+    return removed
+
+
+@transaction.atomic
+def toggle_follow(user_profile, artist):
+    """Unfollow the artist if followed, or follow it. Returns whether followed."""
+    if unfollow_artists(user_profile, [artist.pk]):
+        return False
+    follow_artists(user_profile, [artist.pk])
+    return True
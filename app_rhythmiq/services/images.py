@@ -0,0 +1,124 @@
+"""
+Resized WebP derivatives of the uploaded images.
+
+Covers and profile pictures are resized to each width of ``SIZES`` and stored
+under a name derived from the SHA-256 of the source image, so an image uploaded
+twice (or the default profile picture shared by every profile) is only resized
+once. The names are kept in a JSON field next to the image,
+``{"source": <image name>, "sizes": {"64": <derivative name>, ...}}``, which the
+serializers turn into a map of URLs.
+
+Song covers are resized by the ingestion pipeline, playlist covers and profile
+pictures when they are saved. ``manage.py build_image_derivatives`` fills in the
+existing rows.
+"""
+
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from ..caching import bump_version
+from ..models import Playlist, Song, UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Widths in pixels, smallest first
+SIZES = (64, 160, 320, 640)
+WEBP_QUALITY = 80
+
+# The image field and its derivatives field on each model
+IMAGE_FIELDS = {
+    Song: ("cover_image_path", "cover_derivatives"),
+    Playlist: ("cover_image_path", "cover_derivatives"),
+    UserProfile: ("profile_picture_path", "profile_picture_derivatives"),
+}
+
+
+def derivative_name(digest, size):
+    return f"derivatives/{digest[:2]}/{digest}-{size}.webp"
+
+
+def build_derivatives(field_file):
+    """
+    Store the WebP derivatives of an image and return their names.
+
+    Sizes wider than the image are skipped, except the smallest one; images are
+    never upscaled.
+    """
+    with field_file.open("rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    # Already named after the hash of the source, outside the refcounted storage
+    storage = default_storage
+
+    image = None
+    sizes = {}
+    for size in SIZES:
+        name = derivative_name(digest, size)
+        if not storage.exists(name):
+            if image is None:
+                image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            if sizes and size > image.width:
+                break
+            resized = image.copy()
+            resized.thumbnail((size, size * 4), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, "WEBP", quality=WEBP_QUALITY)
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+        sizes[str(size)] = name
+    return {"source": field_file.name, "sizes": sizes}
+
+
+def needs_derivatives(instance):
+    image_field, derivatives_field = IMAGE_FIELDS[type(instance)]
+    image = getattr(instance, image_field)
+    derivatives = getattr(instance, derivatives_field) or {}
+    if not image:
+        return bool(derivatives)
+    return derivatives.get("source") != image.name
+
+
+def refresh_derivatives(instance):
+    """
+    Rebuild the derivatives of an instance whose image changed. Saves them with
+    an UPDATE, so no save signal is sent again. Returns whether they changed.
+    """
+    if not needs_derivatives(instance):
+        return False
+
+    image_field, derivatives_field = IMAGE_FIELDS[type(instance)]
+    image = getattr(instance, image_field)
+    derivatives = {}
+    if image:
+        try:
+            derivatives = build_derivatives(image)
+        except (OSError, Image.DecompressionBombError) as e:
+            logger.warning("Resizing %s failed: %s", image.name, e)
+            return False
+
+    setattr(instance, derivatives_field, derivatives)
+    type(instance).objects.filter(pk=instance.pk).update(
+        **{derivatives_field: derivatives}, updated_at=timezone.now()
+    )
+    return True
+
+
+@receiver(post_save, sender=Playlist)
+def refresh_playlist_derivatives(sender, instance, **kwargs):
+    refresh_derivatives(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+def refresh_profile_derivatives(sender, instance, **kwargs):
+    if refresh_derivatives(instance):
+        # Song and artist responses embed the profile pictures
+        bump_version("songs", "artists")
@@ -0,0 +1,141 @@
+"""
+Asynchronous ingestion of uploaded songs.
+
+An upload only probes the audio headers (see audio_probe), stores the files and
+creates the song as ``processing`` with a queued IngestionJob. ``manage.py
+process_ingestion`` claims the queued jobs and runs the stages below on the
+stored files, in a pool of worker processes. A song whose stages all pass
+becomes ``ready`` and shows up in the song lists; a song a stage rejects becomes
+``failed`` and keeps the error on its job. Ready songs are added to the feeds of
+the followers of their artists.
+
+Loudness normalization is not one of the stages yet: it needs to decode and
+re-encode the audio, which only the optional ffmpeg transcoder can do, so the
+songs are stored and streamed at the loudness they were uploaded with.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from ..models import IngestionJob, Song
+from . import charts, feeds, images
+
+logger = logging.getLogger(__name__)
+
+# A job still running after this long belongs to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+
+
+class IngestionError(Exception):
+    """An uploaded file was rejected by a stage of the pipeline."""
+
+
+def verify_cover(song):
+    if not song.cover_image_path:
+        return
+    try:
+        with Image.open(song.cover_image_path.path) as image:
+            image.verify()
+    except Exception:
+        raise IngestionError("The cover is not a valid JPEG or PNG image.")
+
+
+def resize_cover(song):
+    if song.cover_image_path:
+        song.cover_derivatives = images.build_derivatives(song.cover_image_path)
+
+
+# The duration, bitrate, sample rate and channels are probed by the upload.
+# Missing: loudness normalization, see the module docstring.
+STAGES = [verify_cover, resize_cover]
+
+
+def enqueue(song):
+    return IngestionJob.objects.create(song=song)
+
+
+def requeue_stale_jobs():
+    """Give the jobs of crashed workers back to the queue, or fail them."""
+    stale = IngestionJob.objects.filter(
+        status=IngestionJob.RUNNING, started_at__lt=timezone.now() - STALE_AFTER
+    )
+    stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=IngestionJob.QUEUED)
+    for job in stale.select_related("song"):
+        fail_job(job, "The job was abandoned by its worker too many times.")
+
+
+def claim_jobs(limit):
+    """
+    Mark up to ``limit`` queued jobs as running and return their ids.
+
+    A job is only claimed by the worker whose UPDATE moved it out of the queue,
+    so several workers can poll the same queue.
+    """
+    claimed = []
+    queued = IngestionJob.objects.filter(status=IngestionJob.QUEUED)
+    for job_id in queued.values_list("id", flat=True)[:limit]:
+        if queued.filter(id=job_id).update(
+            status=IngestionJob.RUNNING,
+            attempts=F("attempts") + 1,
+            started_at=timezone.now(),
+        ):
+            claimed.append(job_id)
+    return claimed
+
+
+def fail_job(job, error):
+    with transaction.atomic():
+        job.status = IngestionJob.FAILED
+        job.error = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+        job.song.status = Song.FAILED
+        job.song.save(update_fields=["status", "updated_at"])
+
+
+def process_job(job_id):
+    """Run every stage on the song of a claimed job. Returns the new job status."""
+    job = IngestionJob.objects.select_related("song").get(id=job_id)
+    song = job.song
+
+    try:
+        for stage in STAGES:
+            stage(song)
+    except IngestionError as e:
+        fail_job(job, str(e))
+        return job.status
+    except Exception:
+        logger.exception("Ingestion of song %s failed", song.id)
+        fail_job(job, "Unexpected error while processing the file.")
+        return job.status
+
+    with transaction.atomic():
+        song.status = Song.READY
+        song.save(update_fields=["cover_derivatives", "status", "updated_at"])
+        job.status = IngestionJob.DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at"])
+        feeds.fan_out(song)
+
+    charts.refresh_new_releases()
+    return job.status
+
+
+def run_pending(limit=20, workers=1):
+    """Claim and process up to ``limit`` queued jobs. Returns their statuses."""
+    requeue_stale_jobs()
+    job_ids = claim_jobs(limit)
+    if workers <= 1 or len(job_ids) <= 1:
+        return [process_job(job_id) for job_id in job_ids]
+
+    # Forked workers must open their own database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(process_job, job_ids))
@@ -0,0 +1,57 @@
+"""
+Liking and unliking songs.
+
+Both are idempotent, so a client can replay them: a like is an INSERT of the
+likes not there yet, an unlike a DELETE, both under a lock of the rows they
+count. Either keeps ``Song.like_count``
+and the tombstones of the delta sync up to date in the same transaction.
+"""
+
+from django.db import transaction
+
+from ..models import Like, Song, Tombstone
+from . import counters, sync
+
+
+@transaction.atomic
+def like_songs(user_profile, song_ids):
+    """Like the songs not liked yet. Returns the ids of the songs that exist."""
+    # Locked until the end of the transaction, so concurrent likes of a song
+    # read the existing likes one after the other and count each new like once
+    song_ids = list(
+        Song.objects.select_for_update()
+        .filter(id__in=set(song_ids))
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    if not song_ids:
+        return []
+
+    # The insert doesn't tell which likes are new, read the existing ones first
+    liked_ids = set(
+        Like.objects.filter(user=user_profile, song_id__in=song_ids).values_list(
+            "song_id", flat=True
+        )
+    )
+    new_ids = [song_id for song_id in song_ids if song_id not in liked_ids]
+    Like.objects.bulk_create(
+        [Like(user=user_profile, song_id=song_id) for song_id in new_ids],
+        ignore_conflicts=True,
+    )
+    counters.increment_many(Song, new_ids, "like_count")
+    return song_ids
+
+
+@transaction.atomic
+def unlike_songs(user_profile, song_ids):
+    """Remove the likes of songs. Returns how many likes were removed."""
+    likes = Like.objects.filter(user=user_profile, song_id__in=set(song_ids))
+    # Locked, so the counters are decremented for the likes this delete removes
+    liked_ids = list(likes.select_for_update().values_list("song_id", flat=True))
+    if not liked_ids:
+        return 0
+    removed, _ = likes.filter(song_id__in=liked_ids).delete()
+    if removed:
+        counters.increment_many(Song, liked_ids, "like_count", -1)
+        sync.bury(user_profile.pk, Tombstone.LIKE, liked_ids)
+    return removed
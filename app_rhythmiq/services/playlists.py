@@ -0,0 +1,225 @@
+"""
+Ordered playlist edits.
+
+Playlist songs are PlaylistEntry rows numbered with gaps of
+``PlaylistEntry.POSITION_GAP``. Songs added or moved between two entries take
+positions inside the gap between them, so an edit only writes the rows of the
+songs it adds or moves. When a gap is used up, the playlist is renumbered once.
+
+Every edit runs in one transaction with one ``bulk_create``, ``bulk_update`` or
+DELETE, plus the queries reading the neighbouring positions. Edits set the
+``updated_at`` of the rows they write and of the playlist, and leave tombstones
+for the songs they remove, for the delta sync.
+"""
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import Playlist, PlaylistEntry, Song, Tombstone
+from . import counters, sync
+
+GAP = PlaylistEntry.POSITION_GAP
+
+
+class PlaylistEditError(Exception):
+    """An edit refers to songs that are not in the playlist."""
+
+
+def lock_playlist(playlist):
+    # Serializes concurrent edits of a playlist on databases with row locks
+    return Playlist.objects.select_for_update().get(pk=playlist.pk)
+
+
+def touch(playlist):
+    # bulk_update() and update() don't set auto_now fields
+    Playlist.objects.filter(pk=playlist.pk).update(updated_at=timezone.now())
+
+
+def renumber(playlist, exclude_song_ids=()):
+    """Space the positions of a playlist evenly again."""
+    entries = list(
+        PlaylistEntry.objects.filter(playlist=playlist)
+        .exclude(song_id__in=exclude_song_ids)
+        .order_by("position", "id")
+    )
+    now = timezone.now()
+    for index, entry in enumerate(entries, start=1):
+        entry.position = index * GAP
+        entry.updated_at = now
+    PlaylistEntry.objects.bulk_update(
+        entries, ["position", "updated_at"], batch_size=500
+    )
+
+
+def free_positions(playlist, count, after=None, before=None, exclude_song_ids=()):
+    """
+    Return ``count`` increasing positions right after the song ``after``, right
+    before the song ``before``, or at the end of the playlist.
+
+    Entries of ``exclude_song_ids`` (the songs being moved) are ignored.
+    """
+    entries = PlaylistEntry.objects.filter(playlist=playlist).exclude(
+        song_id__in=exclude_song_ids
+    )
+
+    for attempt in range(2):
+        if after is None and before is None:
+            last = entries.aggregate(last=Max("position"))["last"] or 0
+            return [last + GAP * index for index in range(1, count + 1)]
+
+        anchor_id = after if after is not None else before
+        try:
+            anchor = entries.get(song_id=anchor_id).position
+        except PlaylistEntry.DoesNotExist:
+            raise PlaylistEditError(f"The song {anchor_id} is not in the playlist.")
+
+        if after is not None:
+            lower = anchor
+            upper = (
+                entries.filter(position__gt=anchor)
+                .order_by("position")
+                .values_list("position", flat=True)
+                .first()
+            )
+            if upper is None:
+                return [lower + GAP * index for index in range(1, count + 1)]
+        else:
+            upper = anchor
+            lower = (
+                entries.filter(position__lt=anchor)
+                .order_by("-position")
+                .values_list("position", flat=True)
+                .first()
+            ) or 0
+
+        step = (upper - lower) // (count + 1)
+        if step > 0:
+            return [lower + step * index for index in range(1, count + 1)]
+
+        # The gap is used up, renumber once and look again
+        renumber(playlist, exclude_song_ids)
+
+    raise PlaylistEditError("Not enough room between the songs.")
+
+
+@transaction.atomic
+def add_songs(playlist, song_ids, after=None, before=None):
+    """
+    Add songs in the given order, after or before a song of the playlist or at
+    the end. Songs already in the playlist are left where they are.
+    Returns the ids of the songs added.
+    """
+    playlist = lock_playlist(playlist)
+    existing = set(
+        PlaylistEntry.objects.filter(
+            playlist=playlist, song_id__in=song_ids
+        ).values_list("song_id", flat=True)
+    )
+    valid = set(Song.objects.filter(id__in=song_ids).values_list("id", flat=True))
+    new_ids = list(
+        dict.fromkeys(
+            song_id
+            for song_id in song_ids
+            if song_id in valid and song_id not in existing
+        )
+    )
+    if not new_ids:
+        return []
+
+    positions = free_positions(playlist, len(new_ids), after, before)
+    PlaylistEntry.objects.bulk_create(
+        [
+            PlaylistEntry(playlist=playlist, song_id=song_id, position=position)
+            for song_id, position in zip(new_ids, positions)
+        ]
+    )
+    # Sets the updated_at of the playlist too
+    counters.increment(Playlist, playlist.pk, "track_count", len(new_ids))
+    return new_ids
+
+
+@transaction.atomic
+def remove_songs(playlist, song_ids):
+    """Remove songs from the playlist. Returns how many were removed."""
+    playlist = lock_playlist(playlist)
+    entries = PlaylistEntry.objects.filter(playlist=playlist, song_id__in=song_ids)
+    # Only the songs actually in the playlist are buried
+    removed_ids = list(entries.values_list("song_id", flat=True))
+    if not removed_ids:
+        return 0
+    deleted, _ = entries.filter(song_id__in=removed_ids).delete()
+    # Sets the updated_at of the playlist too
+    counters.increment(Playlist, playlist.pk, "track_count", -deleted)
+    sync.bury(
+        playlist.creator_user_id,
+        Tombstone.PLAYLIST_SONG,
+        removed_ids,
+        parent_id=playlist.pk,
+    )
+    return deleted
+
+
+@transaction.atomic
+def move_songs(playlist, song_ids, after=None, before=None):
+    """
+    Move songs of the playlist, in the given order, after or before another
+    song or to the end. Returns how many were moved.
+    """
+    playlist = lock_playlist(playlist)
+    song_ids = list(dict.fromkeys(song_ids))
+    if after in song_ids or before in song_ids:
+        raise PlaylistEditError("A song can't be moved next to itself.")
+
+    entries = {
+        entry.song_id: entry
+        for entry in PlaylistEntry.objects.filter(
+            playlist=playlist, song_id__in=song_ids
+        )
+    }
+    missing = [song_id for song_id in song_ids if song_id not in entries]
+    if missing:
+        raise PlaylistEditError(
+            f"The songs {', '.join(map(str, missing))} are not in the playlist."
+        )
+    if not entries:
+        return 0
+
+    positions = free_positions(
+        playlist, len(song_ids), after, before, exclude_song_ids=song_ids
+    )
+    now = timezone.now()
+    moved = []
+    for song_id, position in zip(song_ids, positions):
+        entries[song_id].position = position
+        entries[song_id].updated_at = now
+        moved.append(entries[song_id])
+    PlaylistEntry.objects.bulk_update(moved, ["position", "updated_at"])
+    touch(playlist)
+    return len(moved)
+
+
+@transaction.atomic
+def set_songs(playlist, song_ids):
+    """Replace the songs of a playlist, in the given order."""
+    song_ids = list(dict.fromkeys(song_ids))
+    entries = PlaylistEntry.objects.filter(playlist=playlist)
+    removed = set(entries.values_list("song_id", flat=True)) - set(song_ids)
+    entries.delete()
+    PlaylistEntry.objects.bulk_create(
+        [
+            PlaylistEntry(playlist=playlist, song_id=song_id, position=index * GAP)
+            for index, song_id in enumerate(song_ids, start=1)
+        ]
+    )
+    playlist.track_count = len(song_ids)
+    playlist.updated_at = timezone.now()
+    Playlist.objects.filter(pk=playlist.pk).update(
+        track_count=playlist.track_count, updated_at=playlist.updated_at
+    )
+    sync.bury(
+        playlist.creator_user_id,
+        Tombstone.PLAYLIST_SONG,
+        removed,
+        parent_id=playlist.pk,
+    )
@@ -0,0 +1,122 @@
+"""
+Offline item-item recommendations.
+
+``manage.py build_recommendations`` builds a sparse song x listener matrix from
+the likes and downloads, normalizes its rows and multiplies it by its
+transpose a batch of songs at a time, which gives the cosine similarity of the
+listeners of every pair of songs. The ``NEIGHBOURS`` most similar songs of each
+song are stored as SongNeighbour rows, so the ``similar`` endpoint only reads
+them back.
+
+Building needs numpy and scipy, which the API itself doesn't: install them on
+the machine running the command (``pip install numpy scipy``).
+"""
+
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from ..caching import bump_version
+from ..models import DownloadedSong, Like, Song, SongNeighbour
+
+NEIGHBOURS = 20
+# Songs whose similarities are computed in one sparse product
+BATCH_SIZE = 1024
+INSERT_BATCH_SIZE = 5000
+# How much a like and a download tell about a listener's taste, added up
+WEIGHTS = [(Like, 1.0), (DownloadedSong, 0.5)]
+
+
+def import_numpy():
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            f"Building recommendations requires numpy and scipy ({e}), "
+            "install them with: pip install numpy scipy"
+        )
+    return numpy, sparse
+
+
+def build_matrix(np, sparse):
+    """
+    Return the CSR song x listener matrix of the weights of the ready songs, and
+    the song id of each row.
+    """
+    song_index = {}
+    user_index = {}
+    rows, columns, weights = [], [], []
+    for model, weight in WEIGHTS:
+        pairs = model.objects.filter(song__status=Song.READY).values_list(
+            "song_id", "user_id"
+        )
+        for song_id, user_id in pairs.iterator(chunk_size=10000):
+            rows.append(song_index.setdefault(song_id, len(song_index)))
+            columns.append(user_index.setdefault(user_id, len(user_index)))
+            weights.append(weight)
+
+    # Duplicates (a song liked and downloaded by a listener) are summed
+    matrix = sparse.csr_matrix(
+        (np.array(weights, dtype=np.float64), (rows, columns)),
+        shape=(len(song_index), len(user_index)),
+    )
+    return matrix, list(song_index)
+
+
+def top_neighbours(np, sparse, matrix, k=NEIGHBOURS, batch_size=BATCH_SIZE):
+    """
+    Yield (row, neighbour rows, scores) for every row of ``matrix``: the ``k``
+    rows of highest cosine similarity, best first.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    normalized = sparse.diags(1 / norms) @ matrix
+    transposed = normalized.T.tocsc()
+
+    for start in range(0, matrix.shape[0], batch_size):
+        # Only the pairs of songs sharing a listener are non-zero
+        similarities = (normalized[start : start + batch_size] @ transposed).tocsr()
+        for offset in range(similarities.shape[0]):
+            row = start + offset
+            begin, end = similarities.indptr[offset], similarities.indptr[offset + 1]
+            columns = similarities.indices[begin:end]
+            scores = similarities.data[begin:end]
+            keep = (columns != row) & (scores > 0)
+            columns, scores = columns[keep], scores[keep]
+            # Best score first, then lowest row, so rebuilds are stable
+            order = np.lexsort((columns, -scores))[:k]
+            yield row, columns[order], scores[order]
+
+
+@transaction.atomic
+def store(neighbours):
+    """Replace every SongNeighbour row. Returns how many were stored."""
+    SongNeighbour.objects.all().delete()
+    stored = 0
+    while batch := list(islice(neighbours, INSERT_BATCH_SIZE)):
+        SongNeighbour.objects.bulk_create(batch)
+        stored += len(batch)
+    return stored
+
+
+def build(k=NEIGHBOURS, batch_size=BATCH_SIZE):
+    """Rebuild the neighbours of every song. Returns the number of songs and rows."""
+    np, sparse = import_numpy()
+    matrix, song_ids = build_matrix(np, sparse)
+
+    neighbours = (
+        SongNeighbour(
+            song_id=song_ids[row],
+            neighbour_id=song_ids[column],
+            rank=rank,
+            score=min(float(score), 1.0),
+        )
+        for row, columns, scores in top_neighbours(np, sparse, matrix, k, batch_size)
+        for rank, (column, score) in enumerate(zip(columns, scores), start=1)
+    )
+    stored = store(neighbours)
+    # The similar endpoint caches its anonymous responses
+    bump_version("songs")
+    return len(song_ids), stored
@@ -0,0 +1,257 @@
+"""
+Full-text search over songs and artists.
+
+On SQLite, songs and artists are indexed in FTS5 virtual tables created by the
+0003 migration and kept in sync by the signals below. Matches are ranked with
+BM25 in the query and paginated with LIMIT/OFFSET. Other databases fall back to
+``icontains`` filters with a relevance score computed in SQL.
+
+Bulk writes (``bulk_create``, ``update``) don't send signals; run
+``manage.py rebuild_search_index`` after them.
+"""
+
+from django.db import connection
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from ..models import Genre, Song, UserProfile
+
+SONG_TABLE = "song_search"
+ARTIST_TABLE = "artist_search"
+
+# BM25 weights of the name, description and genres columns
+SONG_WEIGHTS = (2.0, 1.0, 1.0)
+
+
+def split_terms(search):
+    """Split a search string into terms, dropping the FTS5 quote character."""
+    return [term for term in search.replace('"', " ").split() if term]
+
+
+def to_match_query(terms):
+    """Match any of the terms, each as a prefix: ``"roc"* OR "jaz"*``."""
+    return " OR ".join(f'"{term}"*' for term in terms)
+
+
+class SearchResults:
+    """
+    Ranked search results, evaluated lazily one page at a time.
+
+    Supports ``count()`` and slicing, which is all the DRF paginators need.
+    """
+
+    def __init__(self, table, match, order_by, queryset):
+        self.table = table
+        self.match = match
+        self.order_by = order_by
+        self.queryset = queryset
+        self._count = None
+
+    def get_queryset_filter(self):
+        """
+        The condition keeping the matches in the queryset, so the count and the
+        pages skip the same rows (songs not ready, for instance).
+        """
+        sql, params = self.queryset.order_by().values("pk").query.sql_with_params()
+        return f"rowid IN ({sql})", list(params)
+
+    def count(self):
+        if self._count is None:
+            condition, params = self.get_queryset_filter()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {self.table} "
+                    f"WHERE {self.table} MATCH %s AND {condition}",
+                    [self.match, *params],
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item : item + 1][0]
+
+        start = item.start or 0
+        limit = -1 if item.stop is None else max(item.stop - start, 0)
+        condition, params = self.get_queryset_filter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} "
+                f"WHERE {self.table} MATCH %s AND {condition} "
+                f"ORDER BY {self.order_by}, rowid LIMIT %s OFFSET %s",
+                [self.match, *params, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        # Rows deleted since the page query are dropped
+        objects = self.queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+
+class SQLiteFTSBackend:
+    """Search backed by the SQLite FTS5 tables."""
+
+    def search_songs(self, search, queryset):
+        order_by = "bm25({}, {}, {}, {})".format(SONG_TABLE, *SONG_WEIGHTS)
+        match = to_match_query(split_terms(search))
+        return SearchResults(SONG_TABLE, match, order_by, queryset)
+
+    def search_artists(self, search, queryset):
+        order_by = f"bm25({ARTIST_TABLE})"
+        match = to_match_query(split_terms(search))
+        return SearchResults(ARTIST_TABLE, match, order_by, queryset)
+
+    def index_songs(self, song_ids):
+        song_ids = list(song_ids)
+        songs = Song.objects.filter(id__in=song_ids).prefetch_related("genres")
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SONG_TABLE} WHERE rowid = %s",
+                [(song_id,) for song_id in song_ids],
+            )
+            cursor.executemany(
+                f"INSERT INTO {SONG_TABLE} (rowid, name, description, genres) "
+                "VALUES (%s, %s, %s, %s)",
+                [
+                    (
+                        song.id,
+                        song.name,
+                        song.description,
+                        " ".join(genre.name for genre in song.genres.all()),
+                    )
+                    for song in songs
+                ],
+            )
+
+    def remove_song(self, song_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SONG_TABLE} WHERE rowid = %s", [song_id])
+
+    def index_artist(self, profile):
+        self.remove_artist(profile.pk)
+        if profile.account_type != 2:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {ARTIST_TABLE} (rowid, showed_name) VALUES (%s, %s)",
+                [profile.pk, profile.showed_name],
+            )
+
+    def remove_artist(self, profile_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {ARTIST_TABLE} WHERE rowid = %s", [profile_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SONG_TABLE}")
+            cursor.execute(f"DELETE FROM {ARTIST_TABLE}")
+        self.index_songs(Song.objects.values_list("id", flat=True))
+        for profile in UserProfile.objects.filter(account_type=2).only(
+            "pk", "showed_name", "account_type"
+        ):
+            self.index_artist(profile)
+
+
+class DatabaseBackend:
+    """
+    Portable search with ``icontains`` filters, ranked in SQL.
+
+    A match in the name scores 2, in the description or a genre name 1.
+    """
+
+    def search_songs(self, search, queryset):
+        relevance = Value(0)
+        for term in split_terms(search):
+            in_genres = Exists(
+                Genre.objects.filter(songs=OuterRef("pk"), name__icontains=term)
+            )
+            relevance = (
+                relevance
+                + Case(When(name__icontains=term, then=Value(2)), default=Value(0))
+                + Case(
+                    When(description__icontains=term, then=Value(1)), default=Value(0)
+                )
+                + Case(When(in_genres, then=Value(1)), default=Value(0))
+            )
+        return (
+            queryset.annotate(relevance=relevance)
+            .filter(relevance__gt=0)
+            .order_by("-relevance", "id")
+        )
+
+    def search_artists(self, search, queryset):
+        query = Q()
+        for term in split_terms(search):
+            query |= Q(showed_name__icontains=term)
+        return queryset.filter(query).order_by("showed_name", "pk")
+
+    def index_songs(self, song_ids):
+        pass
+
+    def remove_song(self, song_id):
+        pass
+
+    def index_artist(self, profile):
+        pass
+
+    def remove_artist(self, profile_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+def get_backend():
+    if connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    return DatabaseBackend()
+
+
+@receiver(post_save, sender=Song)
+def index_saved_song(sender, instance, **kwargs):
+    get_backend().index_songs([instance.id])
+
+
+@receiver(post_delete, sender=Song)
+def remove_deleted_song(sender, instance, **kwargs):
+    get_backend().remove_song(instance.id)
+
+
+@receiver(m2m_changed, sender=Song.genres.through)
+def index_song_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        get_backend().index_songs([instance.id])
+    elif pk_set:
+        get_backend().index_songs(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+def index_saved_genre(sender, instance, created, **kwargs):
+    if not created:
+        get_backend().index_songs(instance.songs.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Genre)
+def collect_deleted_genre_songs(sender, instance, **kwargs):
+    instance.search_song_ids = list(instance.songs.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+def index_deleted_genre_songs(sender, instance, **kwargs):
+    get_backend().index_songs(getattr(instance, "search_song_ids", []))
+
+
+@receiver(post_save, sender=UserProfile)
+def index_saved_profile(sender, instance, **kwargs):
+    get_backend().index_artist(instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_deleted_profile(sender, instance, **kwargs):
+    get_backend().remove_artist(instance.pk)
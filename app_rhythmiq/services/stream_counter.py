@@ -0,0 +1,152 @@
+"""
+Write-behind counter for song plays.
+
+Buffered plays are counted in the "counters" cache, one counter per song and
+time bucket. Unlike the default cache, it never evicts them before they are
+flushed.
+``flush()`` later applies them to ``Song.streaming_numbers`` with one
+``F("streaming_numbers") + delta`` UPDATE per distinct delta. A bucket is only
+flushed once it is closed, so writers and the flush never touch the same keys.
+
+When buffering is turned off, every play is an immediate atomic ``F()`` update.
+"""
+
+import logging
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils.connection import ConnectionProxy
+
+from ..models import Song
+
+logger = logging.getLogger(__name__)
+
+cache = ConnectionProxy(caches, "counters")
+
+KEY_PREFIX = "stream_counter"
+FLUSHED_KEY = f"{KEY_PREFIX}:flushed"
+LOCK_KEY = f"{KEY_PREFIX}:lock"
+LOCK_TIMEOUT = 300
+UPDATE_BATCH_SIZE = 500
+
+DEFAULT_CONFIG = {
+    "BUFFERED": False,
+    "BUCKET_SECONDS": 10,
+    "KEY_TIMEOUT": 24 * 3600,
+}
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "STREAM_COUNTER", {})}
+
+
+def current_bucket(config):
+    return int(time.time() // config["BUCKET_SECONDS"])
+
+
+def _size_key(bucket):
+    return f"{KEY_PREFIX}:{bucket}:size"
+
+
+def _slot_key(bucket, slot):
+    return f"{KEY_PREFIX}:{bucket}:slot:{slot}"
+
+
+def _count_key(bucket, song_id):
+    return f"{KEY_PREFIX}:{bucket}:count:{song_id}"
+
+
+def record_play(song_id):
+    """Count one play of a song, buffered or immediately depending on the settings."""
+    config = get_config()
+    if not config["BUFFERED"]:
+        Song.objects.filter(id=song_id).update(
+            streaming_numbers=F("streaming_numbers") + 1, updated_at=Now()
+        )
+        return
+
+    bucket = current_bucket(config)
+    timeout = config["KEY_TIMEOUT"]
+    count_key = _count_key(bucket, song_id)
+
+    if cache.add(count_key, 1, timeout):
+        # First play of the song in this bucket, register it in the bucket index
+        cache.add(_size_key(bucket), 0, timeout)
+        slot = cache.incr(_size_key(bucket))
+        cache.set(_slot_key(bucket, slot), song_id, timeout)
+        return
+
+    try:
+        cache.incr(count_key)
+    except ValueError:
+        # The counter expired between add() and incr()
+        record_play(song_id)
+
+
+def flush():
+    """
+    Apply the plays buffered in every closed bucket to the database.
+
+    Returns a mapping of song id to the number of plays applied.
+    """
+    config = get_config()
+    if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+        logger.info("Stream counter flush already running, skipped.")
+        return {}
+
+    try:
+        # Leave one bucket of grace for late writers and clock skew between workers
+        last_bucket = current_bucket(config) - 2
+        flushed_bucket = cache.get(FLUSHED_KEY)
+        if flushed_bucket is None:
+            flushed_bucket = (
+                last_bucket - config["KEY_TIMEOUT"] // config["BUCKET_SECONDS"]
+            )
+
+        deltas = Counter()
+        flushed_keys = []
+        for bucket in range(flushed_bucket + 1, last_bucket + 1):
+            size = cache.get(_size_key(bucket))
+            if not size:
+                continue
+
+            slot_keys = [_slot_key(bucket, slot) for slot in range(1, size + 1)]
+            count_keys = {
+                _count_key(bucket, song_id): song_id
+                for song_id in cache.get_many(slot_keys).values()
+            }
+            for key, count in cache.get_many(list(count_keys)).items():
+                deltas[count_keys[key]] += count
+
+            flushed_keys += [_size_key(bucket), *slot_keys, *count_keys]
+
+        apply_deltas(deltas)
+        cache.set(FLUSHED_KEY, last_bucket, None)
+        cache.delete_many(flushed_keys)
+    finally:
+        cache.delete(LOCK_KEY)
+
+    if deltas:
+        logger.info(f"Flushed {sum(deltas.values())} plays for {len(deltas)} songs.")
+    return dict(deltas)
+
+
+def apply_deltas(deltas):
+    """Add the play counts to the songs, one UPDATE per distinct delta."""
+    songs_by_delta = defaultdict(list)
+    for song_id, delta in deltas.items():
+        songs_by_delta[delta].append(song_id)
+
+    with transaction.atomic():
+        for delta, song_ids in songs_by_delta.items():
+            for start in range(0, len(song_ids), UPDATE_BATCH_SIZE):
+                Song.objects.filter(
+                    id__in=song_ids[start : start + UPDATE_BATCH_SIZE]
+                ).update(
+                    streaming_numbers=F("streaming_numbers") + delta, updated_at=Now()
+                )
@@ -0,0 +1,256 @@
+"""
+Delta sync of the library of a user.
+
+``/api/sync/`` returns the likes, downloads, playlists, playlist songs and
+followed artists of a user created or updated since a cursor, plus the ones
+deleted since, read from Tombstone rows. The cursor is an opaque signed token
+holding the time of the previous sync, minus ``SYNC_LAG`` so rows written by
+transactions still running at that time are sent again next time: clients
+apply the rows as upserts and the tombstones as deletes, both idempotent.
+
+Without a cursor, or with one older than ``TOMBSTONE_RETENTION`` (tombstones
+are pruned by ``manage.py prune_tombstones``), the response is a full snapshot
+flagged with ``reset``: the client replaces its library with it.
+
+Services deleting rows bury them with ``bury``; the rows deleted along with a
+song, a playlist or a followed artist are buried by the signals below.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db.models import F, QuerySet
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import (
+    DownloadedSong,
+    Follow,
+    Like,
+    Playlist,
+    PlaylistEntry,
+    Song,
+    Tombstone,
+    UserProfile,
+)
+
+SALT = "app_rhythmiq.sync"
+SYNC_LAG = timedelta(seconds=10)
+TOMBSTONE_RETENTION = timedelta(days=30)
+BATCH_SIZE = 1000
+
+# The key of each kind of tombstone in the deleted part of a response
+DELETED_KEYS = {
+    Tombstone.LIKE: "likes",
+    Tombstone.DOWNLOAD: "downloads",
+    Tombstone.PLAYLIST: "playlists",
+    Tombstone.PLAYLIST_SONG: "playlist_songs",
+    Tombstone.FOLLOW: "following_artists",
+}
+
+
+class InvalidToken(Exception):
+    """The sync token was not issued by this server."""
+
+
+def issue_token(now=None):
+    """A token for the next sync, a little behind ``now``."""
+    since = (now or timezone.now()) - SYNC_LAG
+    return signing.dumps(since.isoformat(), salt=SALT, compress=True)
+
+
+def read_token(token):
+    """The time a token was issued for; raises InvalidToken."""
+    try:
+        since = parse_datetime(signing.loads(token, salt=SALT))
+    except (signing.BadSignature, TypeError, ValueError):
+        since = None
+    if since is None:
+        raise InvalidToken("Invalid sync token.")
+    return since
+
+
+def bury(user_id, kind, object_ids, parent_id=None):
+    """Record the deletion of rows of a user for the next syncs."""
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(
+                user_id=user_id, kind=kind, object_id=object_id, parent_id=parent_id
+            )
+            for object_id in object_ids
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def deleted_since(user_profile, since, upserts):
+    """
+    The rows deleted since ``since`` by kind, without the ones created again
+    since, which are in ``upserts``.
+    """
+    alive = {
+        Tombstone.LIKE: {row["song"] for row in upserts["likes"]},
+        Tombstone.DOWNLOAD: {row["song"] for row in upserts["downloads"]},
+        Tombstone.PLAYLIST_SONG: {
+            (row["playlist"], row["song"]) for row in upserts["playlist_songs"]
+        },
+        Tombstone.FOLLOW: {row["artist"] for row in upserts["following_artists"]},
+    }
+    deleted = {key: [] for key in DELETED_KEYS.values()}
+    seen = set()
+    tombstones = (
+        Tombstone.objects.filter(user=user_profile, deleted_at__gte=since)
+        .order_by()
+        .values_list("kind", "object_id", "parent_id")
+    )
+    for kind, object_id, parent_id in tombstones:
+        key = item = object_id
+        if kind == Tombstone.PLAYLIST_SONG:
+            key = (parent_id, object_id)
+            item = {"playlist": parent_id, "song": object_id}
+        if key in alive.get(kind, ()) or (kind, key) in seen:
+            continue
+        seen.add((kind, key))
+        deleted[DELETED_KEYS[kind]].append(item)
+    return deleted
+
+
+def changes(user_profile, since=None, now=None):
+    """
+    The library of a user changed since ``since``, everything if None.
+
+    The playlists are returned as a queryset for the view to serialize, the
+    other rows as lists of dicts.
+    """
+    now = now or timezone.now()
+    reset = since is None or since < now - TOMBSTONE_RETENTION
+
+    def lookup(field):
+        # Every row for a snapshot
+        return {} if reset else {f"{field}__gte": since}
+
+    upserts = {
+        "likes": list(
+            Like.objects.filter(user=user_profile, **lookup("created_at"))
+            .order_by("created_at", "id")
+            .values("song", "created_at")
+        ),
+        "downloads": list(
+            DownloadedSong.objects.filter(
+                user=user_profile, **lookup("last_downloaded_at")
+            )
+            .order_by("last_downloaded_at", "id")
+            .values("song", "last_downloaded_at")
+        ),
+        "playlist_songs": list(
+            PlaylistEntry.objects.filter(
+                playlist__creator_user=user_profile, **lookup("updated_at")
+            )
+            .order_by("playlist", "position", "id")
+            .values("playlist", "song", "position")
+        ),
+        "following_artists": list(
+            Follow.objects.filter(from_userprofile=user_profile, **lookup("created_at"))
+            .order_by("created_at", "id")
+            .values("created_at", artist=F("to_userprofile"))
+        ),
+    }
+    if reset:
+        deleted = {key: [] for key in DELETED_KEYS.values()}
+    else:
+        deleted = deleted_since(user_profile, since, upserts)
+
+    return {
+        "token": issue_token(now),
+        "reset": reset,
+        "playlists": Playlist.objects.filter(
+            creator_user=user_profile, **lookup("updated_at")
+        ).order_by("updated_at", "id"),
+        **upserts,
+        "deleted": deleted,
+    }
+
+
+def prune(retention=TOMBSTONE_RETENTION):
+    """Delete the tombstones older than ``retention``. Returns how many."""
+    deleted, _ = Tombstone.objects.filter(
+        deleted_at__lt=timezone.now() - retention
+    ).delete()
+    return deleted
+
+
+def deleted_user_ids(origin):
+    """The ids of the users deleted by a cascade from ``origin``, if any."""
+    if isinstance(origin, QuerySet):
+        model = origin.model
+    else:
+        model = type(origin)
+    if model not in (get_user_model(), UserProfile):
+        return set()
+    if isinstance(origin, QuerySet):
+        return set(origin.values_list("pk", flat=True))
+    # The profile shares the primary key of its user
+    return {origin.pk}
+
+
+@receiver(pre_delete, sender=Song)
+def bury_song_rows(sender, instance, origin=None, **kwargs):
+    # The likes, downloads and playlist songs go with the song, by cascade.
+    # Nothing is buried for a user deleted along with it.
+    skipped = deleted_user_ids(origin)
+    tombstones = []
+    for model, kind in ((Like, Tombstone.LIKE), (DownloadedSong, Tombstone.DOWNLOAD)):
+        user_ids = model.objects.filter(song=instance).values_list("user_id", flat=True)
+        tombstones += [
+            Tombstone(user_id=user_id, kind=kind, object_id=instance.pk)
+            for user_id in user_ids
+            if user_id not in skipped
+        ]
+    entries = list(
+        PlaylistEntry.objects.filter(song=instance).values_list(
+            "playlist_id", "playlist__creator_user_id"
+        )
+    )
+    tombstones += [
+        Tombstone(
+            user_id=user_id,
+            kind=Tombstone.PLAYLIST_SONG,
+            object_id=instance.pk,
+            parent_id=playlist_id,
+        )
+        for playlist_id, user_id in entries
+        if user_id not in skipped
+    ]
+    Tombstone.objects.bulk_create(tombstones, batch_size=BATCH_SIZE)
+    # The playlists change too, their versions are their updated_at
+    Playlist.objects.filter(pk__in={playlist_id for playlist_id, _ in entries}).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(pre_delete, sender=Playlist)
+def bury_playlist(sender, instance, origin=None, **kwargs):
+    # Its songs go with it, clients drop them along with the playlist
+    if instance.creator_user_id not in deleted_user_ids(origin):
+        bury(instance.creator_user_id, Tombstone.PLAYLIST, [instance.pk])
+
+
+@receiver(pre_delete, sender=UserProfile)
+def bury_follows_of_profile(sender, instance, origin=None, **kwargs):
+    # The follows of the deleted profile go with it, by cascade. Nothing is
+    # buried for the followers deleted along with it.
+    skipped = deleted_user_ids(origin)
+    follower_ids = Follow.objects.filter(to_userprofile=instance).values_list(
+        "from_userprofile_id", flat=True
+    )
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(user_id=user_id, kind=Tombstone.FOLLOW, object_id=instance.pk)
+            for user_id in follower_ids
+            if user_id not in skipped
+        ],
+        batch_size=BATCH_SIZE,
+    )
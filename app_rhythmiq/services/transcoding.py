@@ -0,0 +1,291 @@
+"""
+Transcoded renditions of songs and their selection per client.
+
+``manage.py transcode_songs`` produces one SongRendition per quality of the
+ladder for every ready song, with the transcoder picked by the ``TRANSCODING``
+setting. The stream endpoint then serves the rendition matching the ``quality``
+parameter and the ``Accept`` header of the request, or the original upload when
+no rendition is smaller.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import wave
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.db import connections
+from django.db.models import Count, Q
+
+from ..models import Song, SongRendition
+
+logger = logging.getLogger(__name__)
+
+# Target bitrates in bits per second, "original" is the upload itself
+QUALITIES = {
+    "low": 64000,
+    "medium": 128000,
+    "high": 192000,
+    "original": None,
+}
+
+CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+}
+
+DEFAULT_CONFIG = {
+    "BACKEND": "ffmpeg",
+    "CODEC": "mp3",
+    "DEFAULT_QUALITY": "high",
+}
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "TRANSCODING", {})}
+
+
+class TranscodeError(Exception):
+    """The source file could not be transcoded."""
+
+
+class FFmpegTranscoder:
+    """Transcode with a local ffmpeg binary."""
+
+    ENCODERS = {
+        "mp3": ("libmp3lame", "mp3"),
+        "opus": ("libopus", "ogg"),
+    }
+
+    def __init__(self, codec):
+        if codec not in self.ENCODERS:
+            raise ImproperlyConfigured(f"ffmpeg can't encode to {codec}.")
+        if shutil.which("ffmpeg") is None:
+            raise ImproperlyConfigured(
+                "ffmpeg was not found, install it or set TRANSCODING_BACKEND=wav."
+            )
+        self.codec = codec
+        self.encoder, self.extension = self.ENCODERS[codec]
+
+    def transcode(self, source, target, bitrate):
+        command = [
+            "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+            "-i", source,
+            "-vn", "-map_metadata", "-1",
+            "-c:a", self.encoder, "-b:a", str(bitrate),
+            target,
+        ]  # fmt: skip
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise TranscodeError(result.stderr.strip() or "ffmpeg failed.")
+
+
+class WavStandInTranscoder:
+    """
+    Pure-Python stand-in for development and tests: reduce a 16-bit PCM WAV to
+    a mono 16-bit WAV whose sample rate gives the target bitrate.
+    """
+
+    codec = "wav"
+    extension = "wav"
+    frames_per_read = 65536
+
+    def transcode(self, source, target, bitrate):
+        try:
+            source_wav = wave.open(source, "rb")
+        except (wave.Error, EOFError) as e:
+            raise TranscodeError(f"Not a PCM WAV file: {e}")
+
+        with source_wav:
+            if source_wav.getsampwidth() != 2:
+                raise TranscodeError("Only 16-bit WAV files are supported.")
+            channels = source_wav.getnchannels()
+            source_rate = source_wav.getframerate()
+            rate = min(source_rate, bitrate // 16)
+            step = source_rate / rate
+
+            with wave.open(target, "wb") as target_wav:
+                target_wav.setnchannels(1)
+                target_wav.setsampwidth(2)
+                target_wav.setframerate(rate)
+
+                # Keep one frame every `step` frames, averaging the channels
+                offset = 0
+                next_frame = 0.0
+                while True:
+                    samples = array("h", source_wav.readframes(self.frames_per_read))
+                    if not samples:
+                        break
+                    if sys.byteorder == "big":
+                        samples.byteswap()
+                    frames = len(samples) // channels
+
+                    kept = array("h")
+                    while next_frame < offset + frames:
+                        start = (int(next_frame) - offset) * channels
+                        kept.append(sum(samples[start : start + channels]) // channels)
+                        next_frame += step
+                    offset += frames
+
+                    if sys.byteorder == "big":
+                        kept.byteswap()
+                    target_wav.writeframes(kept.tobytes())
+
+
+def get_transcoder():
+    config = get_config()
+    if config["BACKEND"] == "ffmpeg":
+        return FFmpegTranscoder(config["CODEC"])
+    if config["BACKEND"] == "wav":
+        return WavStandInTranscoder()
+    raise ImproperlyConfigured(f"Unknown transcoding backend {config['BACKEND']}.")
+
+
+def get_ladder(song):
+    """The bitrates to transcode a song to, all below the bitrate of its upload."""
+    bitrates = [bitrate for bitrate in QUALITIES.values() if bitrate is not None]
+    if song.bitrate:
+        bitrates = [bitrate for bitrate in bitrates if bitrate < song.bitrate]
+    return bitrates
+
+
+def songs_to_transcode(codec, after_id=0):
+    """Ready songs missing some renditions of their ladder in ``codec``, by id."""
+    bitrates = [bitrate for bitrate in QUALITIES.values() if bitrate is not None]
+    # Renditions in other codecs don't fill the ladder of this one
+    rendition_count = Count(
+        "renditions",
+        filter=Q(renditions__codec=codec, renditions__bitrate__in=bitrates),
+    )
+    songs = (
+        Song.objects.filter(status=Song.READY, id__gt=after_id)
+        .annotate(rendition_count=rendition_count)
+        .filter(rendition_count__lt=len(bitrates))
+        .only("id", "bitrate")
+        .order_by("id")
+    )
+    for song in songs.iterator():
+        if song.rendition_count < len(get_ladder(song)):
+            yield song.id
+
+
+def transcode_song(song_id):
+    """Create the missing renditions of a song. Returns how many were created."""
+    song = Song.objects.get(id=song_id)
+    if not song.song_path or not os.path.isfile(song.song_path.path):
+        logger.warning("Song %s has no audio file to transcode", song.id)
+        return 0
+
+    transcoder = get_transcoder()
+    existing = set(
+        song.renditions.filter(codec=transcoder.codec).values_list("bitrate", flat=True)
+    )
+
+    created = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for bitrate in get_ladder(song):
+            if bitrate in existing:
+                continue
+            target = os.path.join(directory, f"{bitrate}.{transcoder.extension}")
+            try:
+                transcoder.transcode(song.song_path.path, target, bitrate)
+            except TranscodeError:
+                logger.exception("Transcoding song %s to %s failed", song.id, bitrate)
+                continue
+
+            rendition = SongRendition(
+                song=song,
+                codec=transcoder.codec,
+                bitrate=bitrate,
+                size=os.path.getsize(target),
+            )
+            with open(target, "rb") as f:
+                rendition.file.save(os.path.basename(target), File(f), save=False)
+            rendition.save()
+            created += 1
+    return created
+
+
+def transcode_pending(limit=20, workers=1, after_id=0):
+    """
+    Transcode up to ``limit`` songs missing renditions, after the song
+    ``after_id``. Returns the number of renditions made and the last song id.
+
+    Songs whose transcoding fails keep missing renditions; a worker walks the
+    catalog with ``after_id`` so they can't hold back the songs behind them.
+    """
+    # Fail early on a missing ffmpeg rather than once per song
+    codec = get_transcoder().codec
+    song_ids = list(islice(songs_to_transcode(codec, after_id), limit))
+    last_id = song_ids[-1] if song_ids else None
+    if workers <= 1 or len(song_ids) <= 1:
+        return sum(transcode_song(song_id) for song_id in song_ids), last_id
+
+    # Forked workers must open their own database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(transcode_song, song_ids)), last_id
+
+
+def parse_accept(header):
+    """Return the audio content types of an Accept header, best first."""
+    accepted = []
+    for index, part in enumerate((header or "").split(",")):
+        content_type, *params = [value.strip() for value in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if content_type and quality > 0:
+            accepted.append((-quality, index, content_type.lower()))
+    return [content_type for _, _, content_type in sorted(accepted)]
+
+
+def select_rendition(song, quality=None, accept=None):
+    """
+    Pick the file to stream: the rendition with the highest bitrate not above
+    the requested quality, among the codecs the client accepts.
+
+    Returns a SongRendition, or None for the original upload. Reads
+    ``song.renditions.all()``, which list endpoints prefetch.
+    """
+    quality = quality or get_config()["DEFAULT_QUALITY"]
+    if quality not in QUALITIES:
+        raise ValueError(f"Invalid quality value: {quality}.")
+
+    original_format = os.path.splitext(song.song_path.name)[1].lstrip(".").lower()
+    original_type = CONTENT_TYPES.get(original_format, "application/octet-stream")
+    candidates = [(song.bitrate, None, original_type)] + [
+        (rendition.bitrate, rendition, CONTENT_TYPES[rendition.codec])
+        for rendition in song.renditions.all()
+    ]
+
+    accepted = [t for t in parse_accept(accept) if t == "*/*" or t.startswith("audio/")]
+    if accepted and not any(t in ("*/*", "audio/*") for t in accepted):
+        candidates = [c for c in candidates if c[2] in accepted] or candidates[:1]
+
+    def bitrate(candidate):
+        # An unknown original bitrate counts as the highest one
+        return candidate[0] or sys.maxsize
+
+    target = QUALITIES[quality]
+    if target is None:
+        target = sys.maxsize
+    below = [candidate for candidate in candidates if bitrate(candidate) <= target]
+    if below:
+        return max(below, key=bitrate)[1]
+    return min(candidates, key=bitrate)[1]
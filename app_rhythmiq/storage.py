@@ -0,0 +1,177 @@
+"""
+Content-addressed storage for the uploaded media.
+
+Uploads are stored under the SHA-256 of their content,
+``songs/ab/ab12...ef.mp3``, in the directory given by the field's ``upload_to``.
+The same file uploaded twice is stored once, with a MediaBlob row counting its
+references. ``release_file`` drops a reference and, with the last one, queues
+the file for deletion by ``manage.py reap_files``; storing the same content
+again cancels it. The models release the files of their deleted rows, and the
+files their updates replace (see ``find_replaced_files``).
+
+Since a name never points to other content, the hash is used as a strong ETag
+and the files can be cached forever.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+HASH_RE = re.compile(r"(?:^|/)[0-9a-f]{2}/([0-9a-f]{64})(?:\.\w+)?$")
+
+
+def content_etag(name):
+    """The strong ETag of a content-addressed file, None for other files."""
+    match = HASH_RE.search(name or "")
+    return f'"{match.group(1)}"' if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # _save replaces the file name by the hash of the content
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        os.makedirs(self.path(directory or "."), exist_ok=True)
+
+        # Hash the upload while copying it next to its final location
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.path(directory or "."), prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+
+            content_hash = digest.hexdigest()
+            name = posixpath.join(
+                directory, content_hash[:2], f"{content_hash}{extension}"
+            )
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with transaction.atomic():
+                # Waits for reap_files if it is deleting this file, so the file
+                # is checked once it is gone, or kept for good
+                self.cancel_deletion(name)
+                if os.path.exists(path):
+                    os.remove(temp_path)
+                else:
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, path)
+                self.add_reference(name, size)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return name
+
+    def cancel_deletion(self, name):
+        """Drop the queued deletions of a file stored again."""
+        PendingFileDeletion = apps.get_model("app_rhythmiq", "PendingFileDeletion")
+        PendingFileDeletion.objects.filter(name=name).delete()
+
+    def add_reference(self, name, size):
+        MediaBlob = apps.get_model("app_rhythmiq", "MediaBlob")
+        blob, created = MediaBlob.objects.get_or_create(
+            name=name, defaults={"size": size, "ref_count": 1}
+        )
+        if not created:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+
+    def release(self, name):
+        """Drop a reference to a file. Returns whether it was the last one."""
+        MediaBlob = apps.get_model("app_rhythmiq", "MediaBlob")
+        blobs = MediaBlob.objects.filter(name=name)
+        if not blobs.exists():
+            # Stored before the content-addressed storage
+            return True
+
+        blobs.filter(ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+        return bool(blobs.filter(ref_count=0).delete()[0])
+
+    def delete(self, name):
+        """Drop a reference to the file, and the file with the last one."""
+        if self.release(name):
+            super().delete(name)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def queue_deletion(*names):
+    PendingFileDeletion = apps.get_model("app_rhythmiq", "PendingFileDeletion")
+    PendingFileDeletion.objects.bulk_create(
+        [PendingFileDeletion(name=name) for name in names if name]
+    )
+
+
+def release_file(field_file):
+    """
+    Drop the reference of a deleted row to its file, and queue the file for
+    deletion if nothing else uses it.
+
+    Runs in the transaction of the delete: if it rolls back, so do the reference
+    count and the queued deletion, and the file is still there.
+    """
+    if not field_file:
+        return
+    storage = field_file.storage
+    if not isinstance(storage, ContentAddressedStorage) or storage.release(
+        field_file.name
+    ):
+        queue_deletion(field_file.name)
+
+
+def find_replaced_files(instance, field_names, update_fields=None, keep=()):
+    """
+    The files of the stored row that saving ``instance`` replaces: fields cleared,
+    set to another name or given a new upload, which adds its own reference even
+    for the same content. Read before the save, released once it is done.
+    """
+    if instance._state.adding or instance.pk is None:
+        return []
+    if update_fields is not None:
+        field_names = [name for name in field_names if name in update_fields]
+    if not field_names:
+        return []
+    stored = (
+        type(instance)._base_manager.filter(pk=instance.pk).values(*field_names).first()
+    )
+    if stored is None:
+        return []
+
+    replaced = []
+    for field_name in field_names:
+        old_name = stored[field_name]
+        if not old_name or old_name in keep:
+            continue
+        field_file = getattr(instance, field_name)
+        if field_file and field_file._committed and field_file.name == old_name:
+            continue
+        field = instance._meta.get_field(field_name)
+        replaced.append(field.attr_class(instance, field, old_name))
+    return replaced
+
+
+def release_replaced_files(instance):
+    """Release the files ``find_replaced_files`` found for the saved instance."""
+    for field_file in instance.__dict__.pop("_replaced_files", ()):
+        release_file(field_file)
+
+
+def get_media_storage():
+    """Storage of the uploaded songs, covers and profile pictures."""
+    return content_addressed_storage
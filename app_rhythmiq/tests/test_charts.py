@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from app_rhythmiq.models import Genre, Song, SongChartBuild
+from app_rhythmiq.services import charts
+
+from .utils import LOCMEM_CACHES, create_profile, create_song
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=["localhost"])
+class ChartTests(TestCase):
+    def setUp(self):
+        self.artist = create_profile("artist", account_type=2)
+        self.client = APIClient(SERVER_NAME="localhost")
+
+    def top_views(self):
+        response = self.client.get("/api/songs/filter_songs/?filter_by=views")
+        self.assertEqual(response.status_code, 200)
+        return [song["id"] for song in response.json()]
+
+    def test_chart_never_built_ranks_the_catalog(self):
+        song = create_song("song", self.artist)
+        self.assertIsNone(charts.read_chart("global"))
+        self.assertEqual(self.top_views(), [song.pk])
+
+    def test_empty_chart_is_served_empty(self):
+        charts.refresh_charts()
+        # Released after the build, not in the chart until the next one
+        create_song("song", self.artist)
+        self.assertEqual(charts.read_chart("global"), [])
+        self.assertEqual(self.top_views(), [])
+
+    def test_genre_charts_are_built_for_every_genre(self):
+        rock, pop = Genre.objects.create(name="rock"), Genre.objects.create(name="pop")
+        charts.refresh_chart("genre", "all", rock)
+        self.assertEqual(charts.read_genre_charts(["rock"]), [])
+        self.assertIsNone(charts.read_genre_charts(["rock", "pop"]))
+        charts.refresh_chart("genre", "all", pop)
+        self.assertEqual(charts.read_genre_charts(["rock", "pop"]), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RefreshPlayedChartsTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(charts, "CHART_SIZE", 2))
+        artist = create_profile("artist", account_type=2)
+        self.rock = Genre.objects.create(name="rock")
+        self.pop = Genre.objects.create(name="pop")
+        self.songs = [create_song(f"song-{i}", artist) for i in range(3)]
+        for song, streams in zip(self.songs, [30, 20, 10]):
+            song.genres.add(self.rock)
+            Song.objects.filter(pk=song.pk).update(streaming_numbers=streams)
+        charts.refresh_charts()
+
+    def refreshed(self):
+        """The charts rebuilt since the setUp, as (kind, window, genre name)."""
+        return sorted(
+            (build.kind, build.window, build.genre.name if build.genre else None)
+            for build in SongChartBuild.objects.filter(
+                refreshed_at__gt=self.built_at
+            ).select_related("genre")
+        )
+
+    def play(self, song, streams):
+        self.built_at = SongChartBuild.objects.latest("refreshed_at").refreshed_at
+        Song.objects.filter(pk=song.pk).update(streaming_numbers=streams)
+        charts.refresh_charts(song_ids=[song.pk])
+
+    def test_songs_outside_a_full_chart_change_nothing(self):
+        self.play(self.songs[2], 15)
+        self.assertEqual(self.refreshed(), [])
+
+    def test_songs_entering_a_chart_refresh_it(self):
+        self.play(self.songs[2], 25)
+        expected = [("global", window, None) for window in charts.WINDOWS]
+        expected += [("genre", window, "rock") for window in charts.WINDOWS]
+        self.assertEqual(self.refreshed(), sorted(expected))
+        self.assertEqual(
+            charts.read_chart("global"), [self.songs[0].pk, self.songs[2].pk]
+        )
+
+    def test_songs_in_a_chart_refresh_only_their_charts(self):
+        self.play(self.songs[1], 40)
+        self.assertEqual(
+            self.refreshed(),
+            sorted(
+                [("global", window, None) for window in charts.WINDOWS]
+                + [("genre", window, "rock") for window in charts.WINDOWS]
+            ),
+        )
@@ -0,0 +1,90 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from app_rhythmiq.models import Song, UserProfile
+from app_rhythmiq.services import follows, likes
+
+from .utils import LOCMEM_CACHES, create_profile, create_song
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=["localhost"])
+class LikeCountTests(TestCase):
+    """Likes and unlikes replayed any number of times count each like once."""
+
+    def setUp(self):
+        self.listener = create_profile("listener")
+        self.other = create_profile("other")
+        artist = create_profile("artist", account_type=2)
+        self.song = create_song("song", artist)
+        self.second_song = create_song("second", artist)
+
+    def assertLikeCount(self, song, expected):
+        self.assertEqual(Song.objects.get(pk=song.pk).like_count, expected)
+
+    def test_repeated_likes(self):
+        for _ in range(3):
+            likes.like_songs(self.listener, [self.song.pk, self.song.pk])
+        likes.like_songs(self.other, [self.song.pk])
+        self.assertLikeCount(self.song, 2)
+
+    def test_repeated_unlikes(self):
+        likes.like_songs(self.listener, [self.song.pk])
+        likes.like_songs(self.other, [self.song.pk])
+        self.assertEqual(likes.unlike_songs(self.listener, [self.song.pk]), 1)
+        self.assertEqual(likes.unlike_songs(self.listener, [self.song.pk]), 0)
+        self.assertLikeCount(self.song, 1)
+
+    def test_replayed_batch(self):
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(self.listener.user)
+        likes.like_songs(self.listener, [self.second_song.pk])
+        batch = {"like": [self.song.pk], "unlike": [self.second_song.pk]}
+        for _ in range(3):
+            response = client.post("/api/favoritesongs/batch/", batch, format="json")
+            self.assertEqual(response.status_code, 200)
+        self.assertLikeCount(self.song, 1)
+        self.assertLikeCount(self.second_song, 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=["localhost"])
+class FollowerCountTests(TestCase):
+    """Follows and unfollows replayed any number of times count each follow once."""
+
+    def setUp(self):
+        self.listener = create_profile("listener")
+        self.other = create_profile("other")
+        self.artist = create_profile("artist", account_type=2)
+        self.second_artist = create_profile("second", account_type=2)
+
+    def assertFollowerCount(self, artist, expected):
+        self.assertEqual(UserProfile.objects.get(pk=artist.pk).follower_count, expected)
+
+    def test_repeated_follows(self):
+        for _ in range(3):
+            follows.follow_artists(self.listener, [self.artist.pk, self.artist.pk])
+        follows.follow_artists(self.other, [self.artist.pk])
+        self.assertFollowerCount(self.artist, 2)
+
+    def test_repeated_unfollows(self):
+        follows.follow_artists(self.listener, [self.artist.pk])
+        follows.follow_artists(self.other, [self.artist.pk])
+        self.assertEqual(follows.unfollow_artists(self.listener, [self.artist.pk]), 1)
+        self.assertEqual(follows.unfollow_artists(self.listener, [self.artist.pk]), 0)
+        self.assertFollowerCount(self.artist, 1)
+
+    def test_toggle_follow(self):
+        self.assertTrue(follows.toggle_follow(self.listener, self.artist))
+        self.assertFollowerCount(self.artist, 1)
+        self.assertFalse(follows.toggle_follow(self.listener, self.artist))
+        self.assertFollowerCount(self.artist, 0)
+
+    def test_replayed_batch(self):
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(self.listener.user)
+        follows.follow_artists(self.listener, [self.second_artist.pk])
+        batch = {"follow": [self.artist.pk], "unfollow": [self.second_artist.pk]}
+        for _ in range(3):
+            response = client.post("/api/users/follow-batch/", batch, format="json")
+            self.assertEqual(response.status_code, 200)
+        self.assertFollowerCount(self.artist, 1)
+        self.assertFollowerCount(self.second_artist, 0)
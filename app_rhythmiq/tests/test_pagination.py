@@ -0,0 +1,63 @@
+import base64
+import json
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from app_rhythmiq.services import likes
+
+from .utils import LOCMEM_CACHES, create_profile, create_song
+
+
+def encode_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=["localhost"])
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        artist = create_profile("artist", account_type=2)
+        self.songs = [create_song(f"song-{i}", artist) for i in range(5)]
+        self.client = APIClient(SERVER_NAME="localhost")
+
+    def test_pages_walk_every_song_once(self):
+        seen = []
+        url = "/api/songs/?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            seen += [song["id"] for song in data["results"]]
+            url = data["next"]
+        self.assertEqual(seen, [song.pk for song in reversed(self.songs)])
+
+    def test_pages_of_an_annotated_ordering(self):
+        listener = create_profile("listener")
+        likes.like_songs(listener, [song.pk for song in self.songs])
+        self.client.force_authenticate(listener.user)
+        seen = []
+        url = "/api/songs/liked_songs/?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            seen += [song["id"] for song in data["results"]]
+            url = data["next"]
+        self.assertEqual(sorted(seen), [song.pk for song in self.songs])
+
+    def test_tampered_cursor_is_not_found(self):
+        for payload in [
+            {"p": ["notadate", 1]},
+            {"p": ["2024-01-01T00:00:00+00:00", "notanid"]},
+            {"p": [["a list"], {"a": "dict"}]},
+            {"p": ["2024-01-01T00:00:00+00:00"]},
+            {"r": 1},
+        ]:
+            with self.subTest(payload=payload):
+                response = self.client.get(
+                    f"/api/songs/?cursor={encode_cursor(payload)}"
+                )
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get("/api/songs/?cursor=not-base64!")
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_of_popular_ordering(self):
+        cursor = encode_cursor({"p": ["many", 1]})
+        response = self.client.get(f"/api/songs/?order_by=popular&cursor={cursor}")
+        self.assertEqual(response.status_code, 404)
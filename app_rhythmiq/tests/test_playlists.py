@@ -0,0 +1,42 @@
+from django.test import TestCase, override_settings
+
+from app_rhythmiq.models import Playlist, Tombstone
+from app_rhythmiq.services import playlists
+
+from .utils import LOCMEM_CACHES, create_profile, create_song
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RemoveSongsTests(TestCase):
+    def setUp(self):
+        self.listener = create_profile("listener")
+        artist = create_profile("artist", account_type=2)
+        self.songs = [create_song(f"song-{i}", artist) for i in range(3)]
+        self.playlist = Playlist.objects.create(
+            name="playlist", creator_user=self.listener
+        )
+        playlists.add_songs(self.playlist, [song.pk for song in self.songs[:2]])
+
+    def tombstones(self):
+        return sorted(
+            Tombstone.objects.filter(
+                kind=Tombstone.PLAYLIST_SONG, parent_id=self.playlist.pk
+            ).values_list("object_id", flat=True)
+        )
+
+    def test_only_removed_songs_are_buried(self):
+        first, _, outside = self.songs
+        removed = playlists.remove_songs(
+            self.playlist, [first.pk, first.pk, outside.pk, 999999]
+        )
+        self.assertEqual(removed, 1)
+        self.assertEqual(self.tombstones(), [first.pk])
+        self.assertEqual(Playlist.objects.get(pk=self.playlist.pk).track_count, 1)
+
+    def test_removing_songs_not_in_the_playlist_writes_nothing(self):
+        updated_at = Playlist.objects.get(pk=self.playlist.pk).updated_at
+        self.assertEqual(playlists.remove_songs(self.playlist, [999999]), 0)
+        self.assertEqual(self.tombstones(), [])
+        playlist = Playlist.objects.get(pk=self.playlist.pk)
+        self.assertEqual(playlist.track_count, 2)
+        self.assertEqual(playlist.updated_at, updated_at)
@@ -0,0 +1,19 @@
+from django.test import TestCase, override_settings
+
+from app_rhythmiq.management.commands._seeding import measure_song_endpoints
+
+from .utils import LOCMEM_CACHES
+
+SONGS = 10
+
+
+# The seeding helpers request the API as localhost, like the benchmarks
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=["localhost"])
+class SongQueryCountTests(TestCase):
+    """The song endpoints run as many queries for N songs as for 2N."""
+
+    def test_query_count_is_constant(self):
+        results = measure_song_endpoints([SONGS, 2 * SONGS])
+        for name, measures in results.items():
+            with self.subTest(endpoint=name):
+                self.assertEqual(measures[SONGS][0], measures[2 * SONGS][0])
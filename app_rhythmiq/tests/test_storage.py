@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from app_rhythmiq.models import MediaBlob, PendingFileDeletion, Song
+from app_rhythmiq.models.user_profile import DEFAULT_PROFILE_PICTURE
+
+from .utils import LOCMEM_CACHES, create_profile
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReplacedFileTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.song = Song(name="song")
+        self.song.song_path.save("a.mp3", ContentFile(b"first"), save=True)
+        self.first = self.song.song_path.name
+
+    def ref_count(self, name):
+        blob = MediaBlob.objects.filter(name=name).first()
+        return blob.ref_count if blob else None
+
+    def queued(self):
+        return list(PendingFileDeletion.objects.values_list("name", flat=True))
+
+    def test_new_upload_releases_the_old_file(self):
+        self.song.song_path = ContentFile(b"second", name="b.mp3")
+        self.song.save()
+
+        self.assertIsNone(self.ref_count(self.first))
+        self.assertEqual(self.queued(), [self.first])
+        self.assertEqual(self.ref_count(self.song.song_path.name), 1)
+
+    def test_same_content_keeps_one_reference(self):
+        self.song.song_path = ContentFile(b"first", name="c.mp3")
+        self.song.save()
+
+        self.assertEqual(self.song.song_path.name, self.first)
+        self.assertEqual(self.ref_count(self.first), 1)
+        self.assertEqual(self.queued(), [])
+
+    def test_shared_file_is_kept_for_the_other_row(self):
+        other = Song(name="other")
+        other.song_path.save("a.mp3", ContentFile(b"first"), save=True)
+        self.song.song_path = ContentFile(b"second", name="b.mp3")
+        self.song.save()
+
+        self.assertEqual(self.ref_count(self.first), 1)
+        self.assertEqual(self.queued(), [])
+
+    def test_saves_without_the_file_release_nothing(self):
+        self.song.name = "renamed"
+        self.song.save()
+        self.song.save(update_fields=["name"])
+
+        self.assertEqual(self.ref_count(self.first), 1)
+        self.assertEqual(self.queued(), [])
+
+    def test_default_profile_picture_is_never_released(self):
+        profile = create_profile("listener")
+        self.assertEqual(profile.profile_picture_path.name, DEFAULT_PROFILE_PICTURE)
+        profile.profile_picture_path = ContentFile(b"picture", name="me.png")
+        profile.save()
+
+        self.assertNotIn(DEFAULT_PROFILE_PICTURE, self.queued())
+        self.assertEqual(self.ref_count(profile.profile_picture_path.name), 1)
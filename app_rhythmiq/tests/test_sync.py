@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app_rhythmiq.models import DownloadedSong, Playlist, Song, Tombstone
+from app_rhythmiq.services import follows, likes, playlists, sync
+
+from .utils import LOCMEM_CACHES, create_profile, create_song
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=["localhost"])
+class SyncTests(TestCase):
+    def setUp(self):
+        self.listener = create_profile("listener")
+        self.artist = create_profile("artist", account_type=2)
+        self.songs = [create_song(f"song-{i}", self.artist) for i in range(2)]
+        self.playlist = Playlist.objects.create(
+            name="playlist", creator_user=self.listener
+        )
+        self.client = APIClient(SERVER_NAME="localhost")
+        self.client.force_authenticate(self.listener.user)
+
+    def sync(self, since=None):
+        """The changes since a time, read through the endpoint."""
+        params = {"since": sync.issue_token(since + sync.SYNC_LAG)} if since else {}
+        response = self.client.get("/api/sync/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_deleted_and_added_again_is_only_upserted(self):
+        song = self.songs[0]
+        likes.like_songs(self.listener, [song.pk])
+        playlists.add_songs(self.playlist, [song.pk])
+        follows.follow_artists(self.listener, [self.artist.pk])
+        since = timezone.now()
+
+        likes.unlike_songs(self.listener, [song.pk])
+        playlists.remove_songs(self.playlist, [song.pk])
+        follows.unfollow_artists(self.listener, [self.artist.pk])
+        likes.like_songs(self.listener, [song.pk])
+        playlists.add_songs(self.playlist, [song.pk])
+        follows.follow_artists(self.listener, [self.artist.pk])
+
+        changes = self.sync(since)
+        self.assertFalse(changes["reset"])
+        self.assertEqual([row["song"] for row in changes["likes"]], [song.pk])
+        self.assertEqual(
+            [(row["playlist"], row["song"]) for row in changes["playlist_songs"]],
+            [(self.playlist.pk, song.pk)],
+        )
+        self.assertEqual(
+            [row["artist"] for row in changes["following_artists"]], [self.artist.pk]
+        )
+        self.assertEqual(changes["deleted"]["likes"], [])
+        self.assertEqual(changes["deleted"]["playlist_songs"], [])
+        self.assertEqual(changes["deleted"]["following_artists"], [])
+
+    def test_song_delete_buries_its_rows(self):
+        song, other = self.songs
+        likes.like_songs(self.listener, [song.pk, other.pk])
+        DownloadedSong.objects.create(user=self.listener, song=song)
+        playlists.add_songs(self.playlist, [song.pk, other.pk])
+        since = timezone.now()
+
+        Song.objects.get(pk=song.pk).delete()
+
+        changes = self.sync(since)
+        self.assertEqual(changes["deleted"]["likes"], [song.pk])
+        self.assertEqual(changes["deleted"]["downloads"], [song.pk])
+        self.assertEqual(
+            changes["deleted"]["playlist_songs"],
+            [{"playlist": self.playlist.pk, "song": song.pk}],
+        )
+        # The playlist changed with it
+        self.assertEqual(
+            [row["id"] for row in changes["playlists"]], [self.playlist.pk]
+        )
+        self.assertEqual(changes["likes"], [])
+
+    def test_user_delete_buries_the_follows_of_its_followers(self):
+        follows.follow_artists(self.listener, [self.artist.pk])
+        fan = create_profile("fan")
+        follows.follow_artists(fan, [self.artist.pk])
+        since = timezone.now()
+
+        # The fan is deleted along with the artist, only the listener is told
+        type(self.artist.user).objects.filter(pk__in=[self.artist.pk, fan.pk]).delete()
+
+        changes = self.sync(since)
+        self.assertEqual(changes["deleted"]["following_artists"], [self.artist.pk])
+        self.assertEqual(changes["following_artists"], [])
+
+    def test_user_delete_buries_nothing_for_the_deleted_user(self):
+        likes.like_songs(self.listener, [self.songs[0].pk])
+        playlists.add_songs(self.playlist, [self.songs[0].pk])
+        follows.follow_artists(self.listener, [self.artist.pk])
+
+        self.listener.user.delete()
+
+        # Rows buried for the deleted profile would break its foreign key
+        self.assertFalse(Tombstone.objects.filter(user_id=self.listener.pk).exists())
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_token_past_retention_resets(self):
+        likes.like_songs(self.listener, [self.songs[0].pk])
+        likes.unlike_songs(self.listener, [self.songs[0].pk])
+        likes.like_songs(self.listener, [self.songs[1].pk])
+
+        changes = self.sync(timezone.now() - sync.TOMBSTONE_RETENTION - timedelta(1))
+        self.assertTrue(changes["reset"])
+        # A snapshot of the library, without deletions
+        self.assertEqual([row["song"] for row in changes["likes"]], [self.songs[1].pk])
+        self.assertEqual(
+            changes["deleted"], {key: [] for key in sync.DELETED_KEYS.values()}
+        )
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get("/api/sync/", {"since": "not-a-token"})
+        self.assertEqual(response.status_code, 400)
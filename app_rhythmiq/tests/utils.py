@@ -0,0 +1,24 @@
+"""Helpers shared by the tests."""
+
+from django.contrib.auth.models import User
+
+from app_rhythmiq.models import Song, UserProfile
+
+# A cache private to each test run, instead of the shared .cache directory
+LOCMEM_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "counters")
+}
+
+
+def create_profile(username, account_type=1):
+    user = User.objects.create(username=username, email=f"{username}@rhythmiq.test")
+    return UserProfile.objects.create(
+        user=user, showed_name=username, account_type=account_type
+    )
+
+
+def create_song(name, artist):
+    song = Song.objects.create(name=name, song_path=f"songs/{name}.mp3", duration=180)
+    song.artists.add(artist)
+    return song
@@ -2,12 +2,18 @@ from .auth import LoginView, LogoutView, SignUpViewSet, UserView
 
 from .downloaded_song import DownloadedSongViewSet
 
+from .feed import FeedViewSet
+
 from .genre import GenreViewSet
 
 from .like import LikeViewSet
 
 from .song import SongViewSet
 
+from .streaming import serve_media
+
+from .sync import SyncView
+
 from .user_profile import ArtistViewSet, UserProfileViewSet
 
 from app_rhythmiq.views.playlist import PlaylistViewSet
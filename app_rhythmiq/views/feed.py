@@ -0,0 +1,43 @@
+from django.db.models import F
+from rest_framework import mixins, viewsets
+from rest_framework.permissions import IsAuthenticated
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from ..models import Song
+from ..serializers import SongReadSerializer, get_song_read_serializer_class
+from .song import SHAPE_PARAMETER
+
+
+class FeedViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """The home feed of the authenticated user, see services.feeds."""
+
+    permission_classes = [IsAuthenticated]
+    keyset_ordering = ("-published_at", "-id")
+
+    def get_serializer_class(self):
+        return get_song_read_serializer_class(self.request)
+
+    def get_queryset(self):
+        # Read from the feed index of the user, newest first, one page at a time
+        return SongReadSerializer.setup_eager_loading(
+            Song.objects.filter(feed_items__user_id=self.request.user.id).annotate(
+                published_at=F("feed_items__published_at"),
+                feed_reason=F("feed_items__reason"),
+            )
+        )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "New releases of the followed artists and of the genres the user likes "
+            "and downloads, newest first. Each song has its published_at and its "
+            "feed_reason, 'artist' or 'genre'."
+        ),
+        manual_parameters=[SHAPE_PARAMETER],
+        responses={
+            200: SongReadSerializer(many=True),
+            401: openapi.Response(description="Unauthorized"),
+        },
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
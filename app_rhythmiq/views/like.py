@@ -5,7 +5,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework import viewsets
 from ..models import Like
-from ..serializers import LikeSerializer
+from ..serializers import LikeBatchSerializer, LikeSerializer
+from ..services import likes
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -27,10 +28,13 @@ class LikeViewSet(viewsets.ModelViewSet):
             },
             required=["song"],
         ),
+        operation_description=(
+            "Add a song to the favorites. Liking a song already liked succeeds too."
+        ),
         responses={
-            201: LikeSerializer,
+            201: openapi.Response(description="Song added to favorites"),
             400: openapi.Response(
-                description="Bad request - Missing song ID or song already liked",
+                description="Bad request - Missing song ID or song not found",
                 schema=openapi.Schema(
                     type=openapi.TYPE_OBJECT,
                     properties={"detail": openapi.Schema(type=openapi.TYPE_STRING)},
@@ -47,30 +51,31 @@ class LikeViewSet(viewsets.ModelViewSet):
                 {"detail": "Song is required."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        if Like.objects.filter(user=user, song_id=song_id).exists():
+        try:
+            liked = likes.like_songs(user, [int(song_id)])
+        except (TypeError, ValueError):
+            liked = []
+        if not liked:
             return Response(
-                {"detail": "This song is already in your favorites."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"detail": "Song not found."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        like = Like.objects.create(user=user, song_id=song_id)
-        serializer = self.get_serializer(like)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            {"detail": "Song added to favorites.", "song": liked[0]},
+            status=status.HTTP_201_CREATED,
+        )
 
     @swagger_auto_schema(
+        operation_description=(
+            "Remove a song from the favorites. Removing a song not in the favorites "
+            "succeeds too."
+        ),
         responses={
             204: openapi.Response(
                 description="Song successfully removed from favorites"
             ),
             400: openapi.Response(description="Bad request - Missing song ID"),
-            404: openapi.Response(
-                description="Song not found in favorites",
-                schema=openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    properties={"detail": openapi.Schema(type=openapi.TYPE_STRING)},
-                ),
-            ),
-        }
+        },
     )
     def destroy(self, request, *args, **kwargs):
         song_id = kwargs.get("pk")
@@ -82,15 +87,38 @@ class LikeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        like = Like.objects.filter(user=user, song_id=song_id).first()
-        if not like:
+        try:
+            likes.unlike_songs(user, [int(song_id)])
+        except ValueError:
             return Response(
-                {"detail": "This song is not in your favorites."},
-                status=status.HTTP_404_NOT_FOUND,
+                {"detail": "Song ID must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        like.delete()
         return Response(
             {"detail": "Song removed from favorites."},
             status=status.HTTP_204_NO_CONTENT,
         )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Like and unlike many songs at once, e.g. to replay an offline queue. "
+            "Both are idempotent."
+        ),
+        request_body=LikeBatchSerializer,
+        responses={
+            200: openapi.Response(
+                description="The songs liked and the number of likes removed"
+            ),
+            400: openapi.Response(description="Invalid lists of song ids"),
+        },
+    )
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        serializer = LikeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user.userprofile
+
+        liked = likes.like_songs(user, serializer.validated_data["like"])
+        removed = likes.unlike_songs(user, serializer.validated_data["unlike"])
+        return Response({"liked": liked, "removed": removed})
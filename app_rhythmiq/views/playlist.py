@@ -1,59 +1,230 @@
+from django.db.models import F
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.settings import api_settings
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from ..models import Playlist, Song
-from ..serializers import PlaylistSerializer, SongReadSerializer
+from ..conditional import ConditionalGetMixin
+from ..models import Playlist, PlaylistEntry, Song
+from ..pagination import KeysetPagination
+from ..renderers import NDJSONRenderer, ndjson_line
+from ..serializers import (
+    PlaylistSerializer,
+    SongReadSerializer,
+    get_song_read_serializer_class,
+)
+from ..services import playlists
+from .song import SHAPE_PARAMETER
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+PLAYLIST_EDIT_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "song_ids": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Items(type=openapi.TYPE_INTEGER),
+        ),
+        "after": openapi.Schema(
+            type=openapi.TYPE_INTEGER,
+            description="Place the songs right after this song of the playlist",
+        ),
+        "before": openapi.Schema(
+            type=openapi.TYPE_INTEGER,
+            description="Place the songs right before this song of the playlist",
+        ),
+    },
+    required=["song_ids"],
+)
+
+FORMAT_PARAMETER = openapi.Parameter(
+    "format",
+    openapi.IN_QUERY,
+    description=(
+        "'ndjson' to stream every song of the playlist, one JSON object per line, "
+        "instead of a page (same as Accept: application/x-ndjson)"
+    ),
+    type=openapi.TYPE_STRING,
+)
+
 
-class PlaylistViewSet(viewsets.ModelViewSet):
+class PlaylistViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Playlist.objects.all()
     serializer_class = PlaylistSerializer
     permission_classes = [IsAuthenticated]
+    # Playlists embed the profile of their creator
+    version_namespaces = ("artists",)
+    keyset_ordering = ("-created_at", "-id")
+    # Songs serialized per query when streaming a playlist
+    stream_batch_size = 100
+
+    def get_keyset_ordering(self):
+        if self.action == "get_songs":
+            # Playlist order, the song id breaks the ties of a playlist
+            return ("position", "id")
+        return self.keyset_ordering
 
     def perform_create(self, serializer):
         user_profile = self.request.user.userprofile
         serializer.save(creator_user=user_profile)
 
+    def get_edit_arguments(self, request):
+        """Read the song_ids list and the after/before song id of an edit."""
+        song_ids = request.data.get("song_ids", [])
+        if not isinstance(song_ids, list):
+            raise ValidationError(
+                {"status": "error", "message": "song_ids must be a list."}
+            )
+        arguments = {
+            "after": request.data.get("after"),
+            "before": request.data.get("before"),
+        }
+        if arguments["after"] is not None and arguments["before"] is not None:
+            raise ValidationError(
+                {"status": "error", "message": "Use either after or before, not both."}
+            )
+        try:
+            song_ids = [int(song_id) for song_id in song_ids]
+            for key, value in arguments.items():
+                if value is not None:
+                    arguments[key] = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError(
+                {"status": "error", "message": "Song ids must be integers."}
+            )
+        return song_ids, arguments
+
     @swagger_auto_schema(
-        operation_description="Add songs to a playlist",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                "song_ids": openapi.Schema(
-                    type=openapi.TYPE_ARRAY,
-                    items=openapi.Items(type=openapi.TYPE_INTEGER),
-                )
-            },
+        operation_description=(
+            "Add songs to a playlist, in the given order, after or before a song of "
+            "the playlist or at the end. Songs already in the playlist don't move."
         ),
+        request_body=PLAYLIST_EDIT_BODY,
         responses={200: "Songs added to playlist", 400: "No valid songs found"},
     )
     @action(detail=True, methods=["post"])
     def add_songs(self, request, pk=None):
         playlist = self.get_object()
-        song_ids = request.data.get("song_ids", [])
-        songs = Song.objects.filter(id__in=song_ids)
+        song_ids, position = self.get_edit_arguments(request)
+
+        try:
+            added = playlists.add_songs(playlist, song_ids, **position)
+        except playlists.PlaylistEditError as e:
+            return Response({"status": "error", "message": str(e)}, status=400)
 
-        if songs.exists():
-            playlist.songs.add(*songs)
-            return Response({"status": "success", "message": "Songs added to playlist"})
+        if (
+            added
+            or PlaylistEntry.objects.filter(
+                playlist=playlist, song_id__in=song_ids
+            ).exists()
+        ):
+            return Response(
+                {
+                    "status": "success",
+                    "message": "Songs added to playlist",
+                    "added": added,
+                }
+            )
         return Response(
             {"status": "error", "message": "No valid songs found"}, status=400
         )
 
     @swagger_auto_schema(
-        operation_description="Get songs in a playlist",
+        operation_description="Remove songs from a playlist.",
+        request_body=PLAYLIST_EDIT_BODY,
+        responses={200: "Songs removed from playlist"},
+    )
+    @action(detail=True, methods=["post"])
+    def remove_songs(self, request, pk=None):
+        playlist = self.get_object()
+        song_ids, _ = self.get_edit_arguments(request)
+
+        removed = playlists.remove_songs(playlist, song_ids)
+        return Response(
+            {
+                "status": "success",
+                "message": "Songs removed from playlist",
+                "removed": removed,
+            }
+        )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Move songs of a playlist, in the given order, after or before another "
+            "song of the playlist or to the end."
+        ),
+        request_body=PLAYLIST_EDIT_BODY,
+        responses={200: "Songs moved", 400: "Songs not in the playlist"},
+    )
+    @action(detail=True, methods=["post"])
+    def move_songs(self, request, pk=None):
+        playlist = self.get_object()
+        song_ids, position = self.get_edit_arguments(request)
+
+        try:
+            moved = playlists.move_songs(playlist, song_ids, **position)
+        except playlists.PlaylistEditError as e:
+            return Response({"status": "error", "message": str(e)}, status=400)
+
+        return Response({"status": "success", "message": "Songs moved", "moved": moved})
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Get the songs of a playlist in playlist order, one page at a time, or "
+            "all of them as a stream of JSON lines."
+        ),
+        manual_parameters=[FORMAT_PARAMETER, SHAPE_PARAMETER],
         responses={200: SongReadSerializer(many=True)},
     )
-    @action(detail=True, methods=["get"])
+    @action(
+        detail=True,
+        methods=["get"],
+        renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer],
+    )
     def get_songs(self, request, pk=None):
         playlist = self.get_object()
-        songs = playlist.songs.all()
+        # Ordered by position through the join, one page at a time
+        songs = SongReadSerializer.setup_eager_loading(
+            Song.objects.filter(playlist_entries__playlist=playlist).annotate(
+                position=F("playlist_entries__position")
+            )
+        )
 
-        serializer = SongReadSerializer(songs, many=True)
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return StreamingHttpResponse(
+                self.stream_songs(songs), content_type=NDJSONRenderer.media_type
+            )
+
+        page = self.paginate_queryset(songs)
+        serializer_class = get_song_read_serializer_class(request)
+        serializer = serializer_class(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    def stream_songs(self, songs):
+        """
+        Yield every song as a JSON line, serializing them in batches seeking on
+        the playlist order, so the first songs are sent before the last are read.
+        """
+        ordering = self.get_keyset_ordering()
+        songs = songs.order_by(*ordering)
+        context = self.get_serializer_context()
+        position = None
+        while True:
+            batch = songs
+            if position is not None:
+                batch = batch.filter(
+                    KeysetPagination.get_seek_filter(ordering, position)
+                )
+            batch = list(batch[: self.stream_batch_size])
+            if not batch:
+                return
 
-        return Response({"songs": serializer.data})
+            for song in SongReadSerializer(batch, many=True, context=context).data:
+                yield ndjson_line(song)
+            position = [getattr(batch[-1], field) for field in ordering]
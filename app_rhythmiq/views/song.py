@@ -1,32 +1,88 @@
 from rest_framework import viewsets
 from django.http import FileResponse
-from django.db.models import Count, Q
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from ..models import Song, Like, DownloadedSong, UserProfile
-from ..serializers import SongReadSerializer, SongCreateSerializer
+from ..models import Song, UserProfile
+from ..serializers import (
+    SongReadSerializer,
+    SongCreateSerializer,
+    get_song_read_serializer_class,
+)
+from ..caching import cache_anonymous_response
+from ..conditional import ConditionalGetMixin
+from ..storage import content_etag
+from ..pagination import SEARCH_PAGINATION_PARAMETERS, SearchPagination
+from ..services import (
+    audio_probe,
+    charts,
+    ingestion,
+    search,
+    stream_counter,
+    transcoding,
+)
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from .permissions import IsArtist, IsSongArtist
+from .streaming import IgnoreClientContentNegotiation, ranged_file_response
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
-from django.db import models
+from django.db import transaction
+from django.db.models import F
 
 import mimetypes
-from mutagen import File as MutagenFile
+import os
 from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-
-class SongViewSet(viewsets.ModelViewSet):
+ORDER_BY_PARAMETER = openapi.Parameter(
+    "order_by",
+    openapi.IN_QUERY,
+    description="Page ordering: 'recent' (default) or 'popular'",
+    type=openapi.TYPE_STRING,
+)
+
+QUALITY_PARAMETER = openapi.Parameter(
+    "quality",
+    openapi.IN_QUERY,
+    description="Audio quality: 'low', 'medium', 'high' (default) or 'original'",
+    type=openapi.TYPE_STRING,
+)
+
+SHAPE_PARAMETER = openapi.Parameter(
+    "shape",
+    openapi.IN_QUERY,
+    description=(
+        "'normalized' to reference the artists and genres of the songs by id, "
+        "sending each of them once in the artists and genres of the page"
+    ),
+    type=openapi.TYPE_STRING,
+)
+
+
+class SongViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Song.objects.all()
     permission_classes = [
         IsAuthenticatedOrReadOnly,
     ]
     http_method_names = ["get", "post"]
+    # Songs embed their artists, genres and renditions
+    version_namespaces = ("songs",)
+    # The paginated actions, which can send normalized pages
+    normalized_actions = (
+        "list",
+        "search_songs",
+        "liked_songs",
+        "downloaded_songs",
+        "filter_by_artist",
+    )
+    keyset_orderings = {
+        "recent": ("-created_at", "-id"),
+        "popular": ("-streaming_numbers", "-id"),
+    }
 
     def get_permissions(self):
         if self.action in ["update", "partial_update", "destroy"]:
@@ -38,8 +94,51 @@ class SongViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == "create":
             return SongCreateSerializer
+        if self.action in self.normalized_actions:
+            return get_song_read_serializer_class(self.request)
         return SongReadSerializer
 
+    def get_keyset_ordering(self):
+        if self.action == "liked_songs":
+            return ("-liked_at", "-id")
+        if self.action == "downloaded_songs":
+            return ("-downloaded_at", "-id")
+        order_by = self.request.query_params.get("order_by")
+        return self.keyset_orderings.get(order_by, self.keyset_orderings["recent"])
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "stream":
+            return queryset.prefetch_related("renditions")
+        if self.action in ["create", "increment_view"]:
+            return queryset
+        if self.action != "retrieve":
+            # Uploads still being ingested are only reachable by id
+            queryset = queryset.filter(status=Song.READY)
+        if self.action == "liked_songs":
+            # Ordered by like date through the join
+            queryset = queryset.filter(like__user_id=self.request.user.id).annotate(
+                liked_at=F("like__created_at")
+            )
+        elif self.action == "downloaded_songs":
+            # Ordered by last_downloaded_at through the join
+            queryset = queryset.filter(
+                downloadedsong__user_id=self.request.user.id
+            ).annotate(downloaded_at=F("downloadedsong__last_downloaded_at"))
+        return SongReadSerializer.setup_eager_loading(queryset)
+
+    @swagger_auto_schema(
+        operation_description="List songs, one page at a time.",
+        manual_parameters=[ORDER_BY_PARAMETER, QUALITY_PARAMETER, SHAPE_PARAMETER],
+    )
+    @cache_anonymous_response("songs")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_anonymous_response("songs")
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user_id = self.request.user.id
 
@@ -47,10 +146,11 @@ class SongViewSet(viewsets.ModelViewSet):
         if not song_file:
             raise ValidationError({"error": "No song was provided, please try again"})
 
-        if not self.is_valid_audio_file(song_file):
-            raise ValidationError(
-                {"error": "The file is not a valid MP3 or WAV audio file."}
-            )
+        # Read from the headers of the upload, in memory or in its temporary file
+        try:
+            audio_info = audio_probe.probe(song_file)
+        except audio_probe.ProbeError as e:
+            raise ValidationError({"error": str(e)})
 
         image_file = self.request.FILES.get("cover_image_path")
 
@@ -71,47 +171,41 @@ class SongViewSet(viewsets.ModelViewSet):
                     f"The user {artist.user.username} is not an artist."
                 )
 
-        serializer.save(artists=artists)
+        # Store the upload and let the ingestion workers check the rest
+        with transaction.atomic():
+            song = serializer.save(
+                artists=artists, status=Song.PROCESSING, **audio_info.as_song_fields()
+            )
+            ingestion.enqueue(song)
 
-    def is_valid_audio_file(self, file):
+    def is_valid_image_file(self, file):
         """
-        Validate if the uploaded file is a valid MP3 or WAV file.
+        Validate if the uploaded file is a valid image (e.g., JPEG, PNG).
         """
         try:
             mime_type, _ = mimetypes.guess_type(file.name)
-            valid_mime_types = ["audio/mpeg", "audio/wav", "audio/x-wav"]
+            valid_mime_types = ["image/jpeg", "image/png"]
 
             if mime_type not in valid_mime_types:
                 return False
 
-            if mime_type == "audio/mpeg":
-                try:
-                    audio = MutagenFile(file)
-                    if not audio:
-                        return False
-                except Exception as e:
-                    return False
-
             return True
-
         except Exception as e:
             return False
 
-    def is_valid_image_file(self, file):
+    def register_view(self, user, song):
         """
-        Validate if the uploaded file is a valid image (e.g., JPEG, PNG).
+        Count a play of the song, unless the user played it in the last 30 seconds.
         """
-        try:
-            mime_type, _ = mimetypes.guess_type(file.name)
-            valid_mime_types = ["image/jpeg", "image/png"]
-
-            if mime_type not in valid_mime_types:
-                return False
+        cache_key = f"{user.id}_view_{song.id}"
 
-            return True
-        except Exception as e:
+        # The key is only added if the view has not been registered yet
+        if not cache.add(cache_key, "viewed", timeout=30):
             return False
 
+        stream_counter.record_play(song.id)
+        return True
+
     @swagger_auto_schema(
         operation_description="Increment the view count of a song.",
         responses={
@@ -121,24 +215,69 @@ class SongViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def increment_view(self, request, pk=None):
-        user = request.user
         song = self.get_object()
 
-        cache_key = f"{user.id}_view_{song.id}"
-
-        # Check if the view has already been registered for this user and song
-        if cache.get(cache_key):
+        if not self.register_view(request.user, song):
             return Response(
                 {"message": "View already successfully registered."}, status=200
             )
-        song.streaming_numbers += 1
-        song.save()
-
-        # Store the view in cache for 30 seconds to prevent duplicate views
-        cache.set(cache_key, "viewed", timeout=30)
 
         return Response({"message": "View successfully recorded."}, status=200)
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Stream the audio file of a song. The rendition with the highest bitrate "
+            "not above the requested quality is sent, among the audio types of the "
+            "Accept header. Supports Range requests (206 Partial Content) and "
+            "conditional requests with If-None-Match or If-Modified-Since. Requests "
+            "starting at the first byte count as a view for authenticated users."
+        ),
+        manual_parameters=[QUALITY_PARAMETER],
+        responses={
+            200: openapi.Response(description="The whole audio file."),
+            206: openapi.Response(description="The requested part of the audio file."),
+            304: openapi.Response(description="The audio file did not change."),
+            400: openapi.Response(description="Invalid quality value."),
+            404: openapi.Response(description="Song or audio file not found."),
+            416: openapi.Response(description="Requested range not satisfiable."),
+        },
+    )
+    @action(
+        detail=True,
+        methods=["get"],
+        content_negotiation_class=IgnoreClientContentNegotiation,
+    )
+    def stream(self, request, pk=None):
+        song = self.get_object()
+
+        try:
+            rendition = transcoding.select_rendition(
+                song,
+                request.query_params.get("quality"),
+                request.META.get("HTTP_ACCEPT"),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        audio_file = rendition.file if rendition else song.song_path
+        if not audio_file or not os.path.isfile(audio_file.path):
+            return Response({"error": "Audio file not found."}, status=404)
+
+        content_type = transcoding.CONTENT_TYPES[rendition.codec] if rendition else None
+        # Content-addressed files use their hash as a strong ETag
+        response = ranged_file_response(
+            request, audio_file.path, content_type, content_etag(audio_file.name)
+        )
+        patch_vary_headers(response, ["Accept"])
+
+        starts_at_first_byte = response.status_code == 200 or response.get(
+            "Content-Range", ""
+        ).startswith("bytes 0-")
+        if starts_at_first_byte and request.user.is_authenticated:
+            self.register_view(request.user, song)
+
+        return response
+
     @swagger_auto_schema(
         operation_description="Filter songs by views, date, or genre.",
         manual_parameters=[
@@ -154,6 +293,12 @@ class SongViewSet(viewsets.ModelViewSet):
                 description="Comma-separated genre names (required if filter_by is 'genre')",
                 type=openapi.TYPE_STRING,
             ),
+            openapi.Parameter(
+                "window",
+                openapi.IN_QUERY,
+                description="Only songs released in this window: 'all' (default), 'month' or 'week'",
+                type=openapi.TYPE_STRING,
+            ),
         ],
         responses={
             200: SongReadSerializer(many=True),
@@ -163,18 +308,25 @@ class SongViewSet(viewsets.ModelViewSet):
         },
     )
     @action(detail=False, methods=["get"])
+    @cache_anonymous_response("songs")
     def filter_songs(self, request):
         filter_by = request.query_params.get("filter_by")
         if not filter_by:
             return Response({"error": "filter_by parameter is required."}, status=400)
 
+        window = request.query_params.get("window", "all")
+        if window not in charts.WINDOWS:
+            return Response({"error": f"Invalid window value: {window}."}, status=400)
+
         # Filter by views, getting the top 10 songs based on streaming numbers
         if filter_by == "views":
-            songs = Song.objects.order_by("-streaming_numbers")[:10]
+            song_ids = charts.read_chart("global", window)
+            ranking = charts.get_ranking("global", window)
 
         # Filter by date of creation and views, getting the top 10 songs
         elif filter_by == "date_views":
-            songs = Song.objects.order_by("-created_at", "-streaming_numbers")[:10]
+            song_ids = charts.read_chart("new", window)
+            ranking = charts.get_ranking("new", window)
 
         # Filter by genre, with validation for genre names
         elif filter_by == "genre":
@@ -188,22 +340,48 @@ class SongViewSet(viewsets.ModelViewSet):
                 )
 
             genre_list = genre_names.split(",")
-
-            songs = (
-                Song.objects.filter(genres__name__in=genre_list)
-                .annotate(
-                    relevance=Count("genres", filter=Q(genres__name__in=genre_list))
-                )
-                .order_by("-relevance", "-streaming_numbers")
-            )
-
-            songs = songs.distinct()[:10]
+            song_ids = charts.read_genre_charts(genre_list, window)
+            ranking = charts.get_genre_ranking(genre_list, window)
 
         else:
             return Response(
                 {"error": f"Invalid filter_by value: {filter_by}."}, status=400
             )
 
+        if song_ids is not None:
+            # Read the precomputed chart, even empty
+            songs_by_id = self.get_queryset().in_bulk(song_ids)
+            songs = [songs_by_id[id] for id in song_ids if id in songs_by_id]
+        else:
+            # The chart was never built, rank the catalog
+            songs = SongReadSerializer.setup_eager_loading(ranking)[:10]
+
+        serializer = self.get_serializer(songs, many=True)
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Songs liked and downloaded by the listeners of this song, most similar "
+            "first, with their similarity score. Empty until build_recommendations "
+            "has run."
+        ),
+        responses={
+            200: SongReadSerializer(many=True),
+            404: openapi.Response(description="Song not found."),
+        },
+    )
+    @action(detail=True, methods=["get"])
+    @cache_anonymous_response("songs")
+    def similar(self, request, pk=None):
+        song = self.get_object()
+        # Precomputed neighbours, in rank order
+        songs = (
+            self.get_queryset()
+            .filter(neighbour_of__song=song)
+            .annotate(similarity=F("neighbour_of__score"))
+            .order_by("neighbour_of__rank")
+        )
+
         serializer = self.get_serializer(songs, many=True)
         return Response(serializer.data)
 
@@ -215,56 +393,31 @@ class SongViewSet(viewsets.ModelViewSet):
                 openapi.IN_QUERY,
                 description="Search term",
                 type=openapi.TYPE_STRING,
-            )
+            ),
+            *SEARCH_PAGINATION_PARAMETERS,
+            SHAPE_PARAMETER,
         ],
         responses={200: SongReadSerializer(many=True), 400: "Bad Request"},
     )
     @action(detail=False, methods=["get"])
     def search_songs(self, request):
         search_term = request.query_params.get("search")
-        if not search_term:
+        if not search_term or not search.split_terms(search_term):
             return Response(
                 {"error": "The 'search' parameter is required."}, status=400
             )
 
-        # Split the search term
-        search_terms = search_term.split()
-
-        query = Q()
-        for term in search_terms:
-            query |= (
-                Q(name__icontains=term)
-                | Q(description__icontains=term)
-                | Q(genres__name__icontains=term)
-            )
-
-        # limit to 10 results
-        songs = Song.objects.filter(query).distinct()[:10]
-
-        # Add relevance score
-        for song in songs:
-            relevance_score = 0
+        # Ranked by the search backend, one page at a time
+        songs = search.get_backend().search_songs(search_term, self.get_queryset())
 
-            # For each search term, check how many matches exist
-            for term in search_terms:
-                if term.lower() in song.name.lower():
-                    relevance_score += 2
-                if term.lower() in song.description.lower():
-                    relevance_score += 1
-                if any(
-                    term.lower() in genre.name.lower() for genre in song.genres.all()
-                ):
-                    relevance_score += 1
-
-            song.relevance_score = relevance_score
-
-        songs = sorted(songs, key=lambda x: x.relevance_score, reverse=True)
-
-        serializer = SongReadSerializer(songs, many=True, context={"request": request})
-        return Response(serializer.data)
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(songs, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
-        operation_description="Retrieve the songs liked by the authenticated user.",
+        operation_description="Retrieve the songs liked by the authenticated user, most recently liked first.",
+        manual_parameters=[SHAPE_PARAMETER],
         responses={
             200: SongReadSerializer(many=True),
             401: openapi.Response(description="Unauthorized"),
@@ -272,46 +425,25 @@ class SongViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def liked_songs(self, request):
-        user = request.user.userprofile
-
-        liked_songs = Like.objects.filter(user=user).values_list("song", flat=True)
-
-        songs = Song.objects.filter(id__in=liked_songs)
-
-        serializer = SongReadSerializer(songs, many=True, context={"request": request})
-        return Response(serializer.data)
+        # Ordered by like date, one page at a time
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
-        operation_description="Retrieve the songs downloaded by the authenticated user.",
+        operation_description="Retrieve the songs downloaded by the authenticated user, most recently downloaded first.",
+        manual_parameters=[SHAPE_PARAMETER],
         responses={
             200: SongReadSerializer(many=True),
             401: openapi.Response(description="Unauthorized"),
-            404: openapi.Response(description="No downloaded songs found"),
         },
     )
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def downloaded_songs(self, request):
-        user = request.user.userprofile
-
-        downloaded_songs = (
-            DownloadedSong.objects.filter(user=user)
-            .order_by("-last_downloaded_at")
-            .values_list("song", flat=True)
-        )
-
-        # Filter songs by last_downloaded_at date
-        songs = Song.objects.filter(id__in=downloaded_songs).order_by(
-            models.Case(
-                *[
-                    models.When(id=id, then=models.Value(index))
-                    for index, id in enumerate(downloaded_songs)
-                ],
-                default=models.Value(len(downloaded_songs)),
-                output_field=models.IntegerField(),
-            )
-        )
-        serializer = SongReadSerializer(songs, many=True, context={"request": request})
-        return Response(serializer.data)
+        # Ordered by last_downloaded_at, one page at a time
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
         operation_description="Filter songs by a specific artist. The artist is identified by the artist_id parameter.",
@@ -321,7 +453,9 @@ class SongViewSet(viewsets.ModelViewSet):
                 openapi.IN_QUERY,
                 description="The ID of the artist to filter songs by",
                 type=openapi.TYPE_INTEGER,
-            )
+            ),
+            ORDER_BY_PARAMETER,
+            SHAPE_PARAMETER,
         ],
         responses={
             200: SongReadSerializer(many=True),
@@ -345,8 +479,9 @@ class SongViewSet(viewsets.ModelViewSet):
                 {"error": "Artist not found or invalid artist ID."}, status=404
             )
 
-        # Retrieve songs associated with the artist, ordered by creation date
-        songs = Song.objects.filter(artists=artist).order_by("-created_at")
+        # Retrieve songs associated with the artist, one page at a time
+        songs = self.get_queryset().filter(artists=artist)
 
-        serializer = SongReadSerializer(songs, many=True, context={"request": request})
-        return Response(serializer.data)
+        page = self.paginate_queryset(songs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
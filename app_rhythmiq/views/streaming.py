@@ -0,0 +1,158 @@
+import mimetypes
+import os
+import re
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.negotiation import BaseContentNegotiation
+
+from ..storage import content_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class RangeFileWrapper:
+    """Iterate over ``length`` bytes of an open file, from its current position."""
+
+    def __init__(self, file, length, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.remaining = length
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.file.read(min(self.chunk_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte positions requested by a Range header.
+
+    Returns None when the header is missing or not a single byte range, in which
+    case the whole file is sent. Raises ValueError when the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Suffix range, "bytes=-500" is the last 500 bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range.")
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable.")
+    return start, end
+
+
+def is_not_modified(request, etag, mtime):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return "*" in etags or etag in etags
+    if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE"))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def range_is_fresh(request, etag, mtime):
+    """An If-Range precondition only keeps the range if the file did not change."""
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and int(mtime) <= if_range_date
+
+
+def ranged_file_response(request, path, content_type=None, etag=None):
+    """
+    Serve a file with Range/206 Partial Content and conditional GET support.
+
+    Whole files go through FileResponse so the WSGI server can use its
+    ``wsgi.file_wrapper`` (sendfile). Partial responses read the requested bytes
+    in chunks and never load the whole file.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = etag or f'"{int(stat.st_mtime):x}-{size:x}"'
+    content_type = content_type or (
+        mimetypes.guess_type(path)[0] or "application/octet-stream"
+    )
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        response = HttpResponse(status=304)
+    else:
+        try:
+            byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range is None or not range_is_fresh(request, etag, stat.st_mtime):
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            file = open(path, "rb")
+            file.seek(start)
+            response = StreamingHttpResponse(
+                RangeFileWrapper(file, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = str(end - start + 1)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Skip DRF content negotiation for views answering with audio files, whose
+    Accept header lists audio types rather than a renderer's media type.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def serve_media(request, path):
+    """
+    Serve a file of MEDIA_ROOT in development, with Range support. Files named
+    after the hash of their content get it as ETag and are cached forever.
+    """
+    try:
+        full_path = default_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    etag = content_etag(path)
+    response = ranged_file_response(request, full_path, etag=etag)
+    if etag:
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
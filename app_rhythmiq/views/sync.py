@@ -0,0 +1,84 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from ..serializers import PlaylistSyncSerializer
+from ..services import sync
+
+ROWS = openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type="object"))
+IDS = openapi.Schema(
+    type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_INTEGER)
+)
+
+
+class SyncView(APIView):
+    """The changes of the library of the authenticated user, see services.sync."""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "The likes, downloads, playlists, playlist songs and followed artists "
+            "created or updated since the token of the previous sync, to upsert, "
+            "and the ones deleted since, to delete. Without a token, or with an "
+            "expired one, everything is returned with reset set to true. Pass the "
+            "returned token to the next sync."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                description="The token returned by the previous sync",
+                type=openapi.TYPE_STRING,
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description="Changes since the token",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "token": openapi.Schema(type=openapi.TYPE_STRING),
+                        "reset": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        "playlists": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Items(type="object"),
+                        ),
+                        "likes": ROWS,
+                        "downloads": ROWS,
+                        "playlist_songs": ROWS,
+                        "following_artists": ROWS,
+                        "deleted": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "likes": IDS,
+                                "downloads": IDS,
+                                "playlists": IDS,
+                                "playlist_songs": ROWS,
+                                "following_artists": IDS,
+                            },
+                        ),
+                    },
+                ),
+            ),
+            400: openapi.Response(description="Invalid token"),
+            401: openapi.Response(description="Unauthorized"),
+        },
+    )
+    def get(self, request):
+        token = request.query_params.get("since")
+        since = None
+        if token:
+            try:
+                since = sync.read_token(token)
+            except sync.InvalidToken as e:
+                raise ValidationError({"status": "error", "message": str(e)})
+
+        changes = sync.changes(request.user.userprofile, since)
+        changes["playlists"] = PlaylistSyncSerializer(
+            changes["playlists"], many=True, context={"request": request}
+        ).data
+        return Response(changes)
@@ -1,6 +1,14 @@
 from rest_framework import viewsets
-from ..serializers import ArtistSerializer, UserProfileSerializer
+from ..serializers import (
+    ArtistSerializer,
+    FollowBatchSerializer,
+    UserProfileSerializer,
+)
 from ..models import UserProfile
+from ..caching import cache_anonymous_response
+from ..conditional import ConditionalGetMixin
+from ..pagination import SEARCH_PAGINATION_PARAMETERS, SearchPagination
+from ..services import follows, search
 from .permissions import IsProfileOwnerOrPublic, IsProfileOwner
 
 from rest_framework.permissions import BasePermission
@@ -11,13 +19,14 @@ from rest_framework.response import Response
 from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.db.models import Q
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [IsProfileOwnerOrPublic]
+    # Profiles embed the artists they follow
+    version_namespaces = ("artists",)
 
     def get_permissions(self):
         if self.action in ["update", "partial_update", "destroy"]:
@@ -51,21 +60,19 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 
         try:
             # Try to fetch the artist's profile based on the provided artist_id
-            artist = UserProfile.objects.get(user__id=artist_id, account_type=2)
+            artist = UserProfile.objects.get(pk=artist_id, account_type=2)
 
-            if artist.user.id == user_profile.user.id:
+            if artist.pk == user_profile.pk:
                 return Response(
                     {"error": "You cannot follow yourself."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Check if the user is already following the artist and toggle accordingly
-            if artist in user_profile.following_artists.all():
-                user_profile.following_artists.remove(artist)
-                message = f"Successfully unfollowed {artist.showed_name}."
-            else:
-                user_profile.following_artists.add(artist)
+            # Unfollow if a follow row was deleted, follow otherwise
+            if follows.toggle_follow(user_profile, artist):
                 message = f"Successfully followed {artist.showed_name}!"
+            else:
+                message = f"Successfully unfollowed {artist.showed_name}."
 
             return Response({"message": message}, status=status.HTTP_200_OK)
 
@@ -74,11 +81,47 @@ class UserProfileViewSet(viewsets.ModelViewSet):
                 {"error": "Artist not found."}, status=status.HTTP_404_NOT_FOUND
             )
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Follow and unfollow many artists at once, e.g. to replay an offline "
+            "queue. Both are idempotent."
+        ),
+        request_body=FollowBatchSerializer,
+        responses={
+            200: openapi.Response(
+                description="The artists followed and the number of artists unfollowed"
+            ),
+            400: openapi.Response(description="Invalid lists of artist ids"),
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated],
+        url_path="follow-batch",
+    )
+    def follow_batch(self, request):
+        serializer = FollowBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_profile = request.user.userprofile
+
+        followed = follows.follow_artists(
+            user_profile, serializer.validated_data["follow"]
+        )
+        removed = follows.unfollow_artists(
+            user_profile, serializer.validated_data["unfollow"]
+        )
+        return Response({"followed": followed, "removed": removed})
 
-class ArtistViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ArtistViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = UserProfile.objects.filter(account_type=2)
     serializer_class = ArtistSerializer
 
+    @cache_anonymous_response("artists")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_description="Search for artists by their name.",
         manual_parameters=[
@@ -89,6 +132,7 @@ class ArtistViewSet(viewsets.ReadOnlyModelViewSet):
                 type=openapi.TYPE_STRING,
                 required=True,
             ),
+            *SEARCH_PAGINATION_PARAMETERS,
         ],
         responses={
             200: ArtistSerializer(many=True),
@@ -98,16 +142,18 @@ class ArtistViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=["get"])
     def search_artists(self, request):
         search_term = request.query_params.get("search")
-        if not search_term:
+        if not search_term or not search.split_terms(search_term):
             return Response(
                 {"error": "The 'search' parameter is required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Search for artists by showed_name matching the search term and account_type=2 (artist)
-        artists = UserProfile.objects.filter(
-            Q(showed_name__icontains=search_term) & Q(account_type=2)
-        ).distinct()
+        # Search for artists by showed_name, ranked by the search backend
+        artists = search.get_backend().search_artists(
+            search_term, self.get_queryset().select_related("user")
+        )
 
-        serializer = self.get_serializer(artists, many=True)
-        return Response(serializer.data)
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(artists, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
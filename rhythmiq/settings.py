@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from datetime import timedelta
+from importlib.util import find_spec
 from rest_framework.settings import api_settings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -140,6 +142,19 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST FRAMEWORK
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ("knox.auth.TokenAuthentication",),
+    "DEFAULT_PAGINATION_CLASS": "app_rhythmiq.pagination.KeysetPagination",
+    "PAGE_SIZE": 20,
+    # JSON through orjson when it is installed, and MessagePack for clients
+    # sending Accept: application/msgpack when msgpack is (see renderers)
+    "DEFAULT_RENDERER_CLASSES": [
+        "app_rhythmiq.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        *(
+            ["app_rhythmiq.renderers.MessagePackRenderer"]
+            if find_spec("msgpack")
+            else []
+        ),
+    ],
 }
 
 # KNOX
@@ -160,6 +175,27 @@ REST_KNOX = {
 }
 
 
+# STREAM COUNTER
+# Buffered plays are kept in the "counters" cache and applied by
+# `manage.py flush_stream_counts`, otherwise every play is written immediately
+# with an atomic UPDATE.
+STREAM_COUNTER = {
+    "BUFFERED": os.environ.get("STREAM_COUNTER_BUFFERED") == "1",
+    "BUCKET_SECONDS": 10,
+}
+
+
+# TRANSCODING
+# Renditions are produced by `manage.py transcode_songs` with ffmpeg. The "wav"
+# backend is a pure-Python stand-in for development and tests without ffmpeg.
+TRANSCODING = {
+    "BACKEND": os.environ.get("TRANSCODING_BACKEND", "ffmpeg"),
+    "CODEC": "mp3",
+    # Quality streamed when the client asks for none
+    "DEFAULT_QUALITY": "high",
+}
+
+
 # SWAGGER
 SWAGGER_SETTINGS = {
     "USE_SESSION_AUTH": False,
@@ -198,9 +234,40 @@ LOGGING = {
 }
 
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "TIMEOUT": 300,
+# CACHE
+# Shared by every worker process: Redis when REDIS_URL is set (requires the `redis`
+# package), otherwise a file-based stand-in for development and tests. Only Redis
+# makes add() and incr() atomic across processes.
+# The "counters" alias holds the buffered plays until they are flushed, it must
+# never evict them: with Redis, set `maxmemory-policy noeviction` on its server.
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "TIMEOUT": 300,
+        },
+        "counters": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "TIMEOUT": None,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / ".cache",
+            "TIMEOUT": 300,
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+        # Its own directory, never culled: culling drops a third of the entries
+        "counters": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / ".cache" / "counters",
+            "TIMEOUT": None,
+            "OPTIONS": {"MAX_ENTRIES": sys.maxsize},
+        },
     }
-}
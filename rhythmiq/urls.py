@@ -15,6 +15,8 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
+
 from django.contrib import admin
 from django.urls import path, re_path, include
 from app_rhythmiq.views.swagger import schema_view
@@ -24,7 +26,6 @@ import app_rhythmiq.views as rhythmiq_views
 from rest_framework.routers import DefaultRouter
 
 from django.conf import settings
-from django.conf.urls.static import static
 
 router = DefaultRouter()
 
@@ -36,10 +37,12 @@ router.register(r"artists", rhythmiq_views.ArtistViewSet, basename="artists")
 router.register(r"favoritesongs", rhythmiq_views.LikeViewSet, basename="favoritesongs")
 router.register(r"downloadedsongs", rhythmiq_views.DownloadedSongViewSet)
 router.register(r"playlists", rhythmiq_views.PlaylistViewSet, basename="playlist")
+router.register(r"feed", rhythmiq_views.FeedViewSet, basename="feed")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path(r"api/auth/user/", rhythmiq_views.UserView.as_view(), name="user_info"),
+    path(r"api/sync/", rhythmiq_views.SyncView.as_view(), name="sync"),
     path(r"api/login/", rhythmiq_views.LoginView.as_view(), name="knox_login"),
     path(r"api/logout/", rhythmiq_views.LogoutView.as_view(), name="knox_logout"),
     re_path(
@@ -56,4 +59,11 @@ urlpatterns = [
 ]
 
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.DEBUG:
+    # Like static(), with Range requests and caching of content-addressed files
+    urlpatterns += [
+        re_path(
+            r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+            rhythmiq_views.serve_media,
+        )
+    ]